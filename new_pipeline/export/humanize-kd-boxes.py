@@ -19,11 +19,15 @@ Requires:
 from __future__ import annotations
 
 import argparse
+import functools
 import hashlib
+import http.client
 import json
 import os
+import random
 import re
 import time
+import urllib.error
 import urllib.request
 from dataclasses import dataclass
 from pathlib import Path
@@ -32,6 +36,9 @@ from typing import Any, Dict, List, Optional, Tuple
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
 MODULES_PATH = REPO_ROOT / "docs" / "kd" / "modules" / "module_registry.json"
+# Upper bound for a batched call's max_tokens: requests above the model's output limit are
+# rejected with HTTP 400, so the per-item budget times the batch size must not exceed it.
+MAX_OUTPUT_TOKENS = 8192
 
 
 def read_json(path: Path) -> Any:
@@ -184,7 +191,7 @@ def find_box_host(paras: List[Dict[str, Any]], field: str) -> Optional[Dict[str,
     return None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Module:
     module_id: str
     title: str
@@ -192,6 +199,7 @@ class Module:
     intent: str
 
 
+@functools.cache
 def load_modules() -> Dict[str, Module]:
     reg = read_json(MODULES_PATH)
     out: Dict[str, Module] = {}
@@ -208,17 +216,53 @@ def load_modules() -> Dict[str, Module]:
     return out
 
 
+RE_PR_ACUTE = re.compile(r"\b(acuut|reanimat|bls|protocol|spoed|bewusteloos)\b")
+RE_PR_MANTELZORG = re.compile(r"\b(mantelzorg|naasten|familie|overbelasting)\b")
+RE_PR_OBSERVE = re.compile(r"\b(sbar|rapporteer|rapportage|rapporteren|observeer|observatie|signaleer|signaleren|meet|meten|noteer|noteren|meld|melden|bijhouden)\b")
+
+
 def classify_praktijk_module(text: str) -> str:
     t = strip_markers(text).lower()
-    if re.search(r"\b(acuut|reanimat|bls|protocol|spoed|bewusteloos)\b", t):
+    if RE_PR_ACUTE.search(t):
         return "PRAKTIJK_ACUTE_PROTOCOL_BLS"
-    if re.search(r"\b(mantelzorg|naasten|familie|overbelasting)\b", t):
+    if RE_PR_MANTELZORG.search(t):
         return "PRAKTIJK_MANTELZORG_ALIGN"
-    if re.search(r"\b(sbar|rapporteer|rapportage|rapporteren|observeer|observatie|signaleer|signaleren|meet|meten|noteer|noteren|meld|melden|bijhouden)\b", t):
+    if RE_PR_OBSERVE.search(t):
         return "PRAKTIJK_OBSERVE_SIGNAL_REPORT_SBAR"
     return "PRAKTIJK_INFO_ADVICE_HEALTH"
 
 
+PRAKTIJK_MODULE_IDS = (
+    "PRAKTIJK_ACUTE_PROTOCOL_BLS",
+    "PRAKTIJK_MANTELZORG_ALIGN",
+    "PRAKTIJK_OBSERVE_SIGNAL_REPORT_SBAR",
+    "PRAKTIJK_INFO_ADVICE_HEALTH",
+)
+
+
+class TransientError(Exception):
+    """Retryable failure (network error, timeout, 5xx)."""
+
+
+class RateLimitError(TransientError):
+    """429/overloaded response; `wait` is the server-advised delay in seconds (0 if none given)."""
+
+    def __init__(self, msg: str, wait: float = 0.0) -> None:
+        super().__init__(msg)
+        self.wait = wait
+
+
+class FatalError(Exception):
+    """Non-retryable request error (4xx other than 408/429)."""
+
+
+def parse_retry_after(value: Optional[str]) -> float:
+    try:
+        return max(0.0, float(value or 0))
+    except ValueError:
+        return 0.0
+
+
 def anthropic_messages(api_key: str, model: str, system: str, user: str, max_tokens: int, temperature: float) -> str:
     req = {
         "model": model,
@@ -238,31 +282,71 @@ def anthropic_messages(api_key: str, model: str, system: str, user: str, max_tok
         },
         method="POST",
     )
-    with urllib.request.urlopen(r, timeout=120) as resp:
-        raw = resp.read().decode("utf-8", errors="replace")
+    try:
+        with urllib.request.urlopen(r, timeout=120) as resp:
+            raw = resp.read()
+    except urllib.error.HTTPError as e:
+        body = e.read().decode("utf-8", errors="replace")[:300]
+        msg = f"HTTP {e.code}: {body}"
+        if e.code in (429, 503, 529):
+            raise RateLimitError(msg, wait=parse_retry_after(e.headers.get("retry-after"))) from e
+        if e.code >= 500 or e.code == 408:
+            raise TransientError(msg) from e
+        raise FatalError(msg) from e
+    except (OSError, http.client.HTTPException) as e:
+        # URLError/timeouts, plus what urllib does not wrap: RemoteDisconnected/ConnectionResetError
+        # from getresponse() and IncompleteRead from resp.read().
+        raise TransientError(str(e) or type(e).__name__) from e
+    # json.loads accepts UTF-8 bytes directly; skip the intermediate str decode.
+    # Only content[].text is used, so join it straight from the blocks.
     jd = json.loads(raw)
     blocks = jd.get("content") or []
-    texts: List[str] = []
-    for b in blocks:
-        if isinstance(b, dict) and isinstance(b.get("text"), str):
-            texts.append(b["text"])
-    return "".join(texts).strip()
+    return "".join(b["text"] for b in blocks if isinstance(b, dict) and isinstance(b.get("text"), str)).strip()
 
 
-def parse_jsonish_object(s: str) -> Dict[str, Any]:
+def strip_code_fences(s: str) -> str:
     raw = (s or "").strip()
-    # Strip markdown fences
-    raw = re.sub(r"^```[a-zA-Z0-9_-]*\s*", "", raw)
-    raw = re.sub(r"\s*```$", "", raw)
+    # Literal prefix/suffix checks; no regex pass needed
+    if raw.startswith("```"):
+        nl = raw.find("\n")
+        raw = raw[nl + 1 :] if nl != -1 else raw[3:]
+    if raw.endswith("```"):
+        raw = raw[:-3].rstrip()
+    return raw
+
+
+def parse_jsonish_object(s: str) -> Dict[str, Any]:
+    raw = strip_code_fences(s)
     # Find JSON object
     i = raw.find("{")
     j = raw.rfind("}")
-    if i >= 0 and j >= 0 and j > i:
+    if 0 <= i < j:
         raw = raw[i : j + 1]
     return json.loads(raw)
 
 
+def parse_jsonish_array(s: str) -> List[Any]:
+    raw = strip_code_fences(s)
+    # Find JSON array
+    i = raw.find("[")
+    j = raw.rfind("]")
+    if 0 <= i < j:
+        raw = raw[i : j + 1]
+    out = json.loads(raw)
+    if not isinstance(out, list):
+        raise ValueError("Expected a JSON array")
+    return out
+
+
 def stable_hash(*parts: str) -> str:
+    # One update over the joined bytes; blake2b with an 8-byte digest gives the same 16-hex key length.
+    data = b"\n".join((p or "").encode("utf-8") for p in parts)
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def legacy_cache_key(*parts: str) -> str:
+    # Key derivation of caches written before keys were built from the prompt inputs:
+    # sha256 over (chapter, num, rendered user prompt, model). Read as a fallback only.
     h = hashlib.sha256()
     for p in parts:
         h.update((p or "").encode("utf-8"))
@@ -282,6 +366,7 @@ def main() -> None:
     ap.add_argument("--temperature", type=float, default=0.25)
     ap.add_argument("--cache", default="", help="Optional cache JSON path (to avoid re-calling LLM)")
     ap.add_argument("--prompt-version", default="v1", help="Bump to invalidate cache when prompt rules change")
+    ap.add_argument("--batch-size", type=int, default=8, help="Subparagraphs per LLM call (1 = one call per subparagraph)")
     args = ap.parse_args()
 
     api_key = str(os.environ.get("ANTHROPIC_API_KEY") or "").strip()
@@ -299,7 +384,19 @@ def main() -> None:
     base_subs = extract_subparagraphs(base_book, args.chapter)
     cur_subs = extract_subparagraphs(cur_book, args.chapter)
 
+    # Precompute the clamped (~220 words) basis context once per subparagraph so every
+    # prompt built for it (praktijk and/or verdieping) shares the same string.
+    for num, sp in cur_subs.items():
+        basis_full = (base_subs.get(num) or {}).get("all_basis_text") or sp.get("all_basis_text") or ""
+        ctx_words = basis_full.split()
+        basis_context = " ".join(ctx_words[:220])
+        if len(ctx_words) > 220:
+            basis_context += " …"
+        sp["basis_context"] = basis_context
+
     modules = load_modules()
+    # classify_praktijk_module only ever returns these ids; resolve them once.
+    pr_modules: Dict[str, Optional[Module]] = {mid: modules.get(mid) for mid in PRAKTIJK_MODULE_IDS}
 
     cache_path = Path(args.cache) if args.cache else None
     cache: Dict[str, Any] = {}
@@ -350,9 +447,8 @@ def main() -> None:
         "- Gebruik eenvoudige zinnen, maar niet kinderachtig.\n"
     )
 
-    def build_user_prompt(num: str, title: str, basis_context: str, pr_need: bool, vd_need: bool, pr_module: Optional[Module], pr_current: str, vd_current: str) -> str:
+    def build_item_lines(num: str, title: str, basis_context: str, pr_need: bool, vd_need: bool, pr_module: Optional[Module], pr_current: str, vd_current: str) -> List[str]:
         parts: List[str] = []
-        parts.append(f"PROMPT_VERSION: {args.prompt_version}")
         parts.append(f"Subparagraaf: {num} — {title}".strip())
         parts.append("")
         parts.append("Context (basis, fragment):")
@@ -377,20 +473,77 @@ def main() -> None:
         else:
             parts.append("Je taak: VERDIEPING leeg laten.")
             parts.append("")
+        return parts
+
+    def build_user_prompt(item_lines: List[str]) -> str:
+        parts: List[str] = [f"PROMPT_VERSION: {args.prompt_version}"]
+        parts.extend(item_lines)
         parts.append("Output: geef STRICT JSON met precies deze keys: praktijk, verdieping.")
         parts.append('Voorbeeld: {"praktijk":"...","verdieping":""}')
         return "\n".join(parts).strip() + "\n"
 
+    def build_batch_prompt(items: List[Dict[str, Any]]) -> str:
+        parts: List[str] = [f"PROMPT_VERSION: {args.prompt_version}"]
+        parts.append(f"Je krijgt {len(items)} subparagrafen. Behandel elke subparagraaf los van de andere.")
+        parts.append("")
+        for i, it in enumerate(items, start=1):
+            parts.append(f"=== ITEM {i} (num: {it['num']}) ===")
+            parts.extend(it["item_lines"])
+        parts.append("Output: geef STRICT JSON: een array in dezelfde volgorde als de items.")
+        parts.append("Elk element is een object met precies deze keys: num, praktijk, verdieping.")
+        parts.append('Voorbeeld: [{"num":"1.1.1","praktijk":"...","verdieping":""}]')
+        return "\n".join(parts).strip() + "\n"
+
+    def is_box_obj(o: Any) -> bool:
+        return isinstance(o, dict) and isinstance(o.get("praktijk"), str) and isinstance(o.get("verdieping"), str)
+
+    def call_llm(label: str, user_prompt: str, max_tokens: int, parse: Any, retry_parse: bool = True) -> Any:
+        # Retry transient failures with jittered exponential backoff (honoring retry-after on 429/overload).
+        # FatalError (e.g. 400/401) propagates immediately: retrying cannot fix it.
+        # retry_parse=False gives up on the first unparseable output (a batch cut off at max_tokens
+        # fails the same way every time; the caller falls back to single calls instead).
+        last_err: Optional[Exception] = None
+        for attempt in range(5):
+            try:
+                resp = anthropic_messages(api_key, args.model, system, user_prompt, max_tokens, args.temperature)
+                return parse(resp)
+            except RateLimitError as e:
+                last_err = e
+                time.sleep(e.wait or random.uniform(1.0, 2 ** (attempt + 1)))
+            except (TransientError, ValueError) as e:
+                # ValueError covers unparseable model output (json.JSONDecodeError)
+                if isinstance(e, ValueError) and not retry_parse:
+                    raise RuntimeError(f"LLM output unparseable for {label}: {e}") from e
+                last_err = e
+                time.sleep(random.uniform(0.5, 2**attempt))
+        raise RuntimeError(f"LLM failed for {label}: {last_err}")
+
+    def save_cache() -> None:
+        if not cache_path:
+            return
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(json.dumps(cache, ensure_ascii=False, indent=2) + "\n", "utf-8")
+        except Exception:
+            pass
+
     start = time.time()
-    for idx, (num, pr_need, vd_need) in enumerate(targets, start=1):
+
+    # Pass 1: resolve cache hits, then build prompts for the misses only.
+    # Cache keys are per subparagraph and built from the prompt *inputs* (the praktijk module is
+    # derived from pr_current), so classification/prompt building is skipped on a hit.
+    # The module registry and system prompt also feed the prompt, so a digest of both is part of the key.
+    prompt_digest = stable_hash(
+        system,
+        *(f"{m.module_id}\t{m.title}\t{m.kind}\t{m.intent}" for m in modules.values()),
+    )
+    items: List[Dict[str, Any]] = []
+    results: Dict[str, Dict[str, Any]] = {}
+    migrated = 0
+    for num, pr_need, vd_need in targets:
         cur = cur_subs[num]
         title = cur.get("title") or ""
-        basis_full = str((base_subs.get(num) or {}).get("all_basis_text") or cur.get("all_basis_text") or "")
-        # Clamp context to ~220 words
-        ctx_words = basis_full.split()
-        basis_context = " ".join(ctx_words[:220]).strip()
-        if len(ctx_words) > 220:
-            basis_context += " …"
+        basis_context = cur["basis_context"]
 
         cur_paras = cur.get("paragraphs") or []
         pr_host = find_box_host(cur_paras, "praktijk")
@@ -398,38 +551,87 @@ def main() -> None:
         pr_current = strip_markers(str(pr_host.get("praktijk") or "")) if (pr_host and pr_need) else ""
         vd_current = strip_markers(str(vd_host.get("verdieping") or "")) if (vd_host and vd_need) else ""
 
-        pr_mid = classify_praktijk_module(pr_current) if pr_need else ""
-        pr_module = modules.get(pr_mid) if pr_mid else None
-
-        user_prompt = build_user_prompt(num, title, basis_context, pr_need, vd_need, pr_module, pr_current, vd_current)
-        cache_key = stable_hash(str(args.chapter), num, user_prompt, args.model)
+        cache_key = stable_hash(
+            str(args.chapter),
+            num,
+            args.prompt_version,
+            title,
+            basis_context,
+            f"pr={int(pr_need)} vd={int(vd_need)}",
+            pr_current,
+            vd_current,
+            args.model,
+            prompt_digest,
+        )
         cached = cache.get(cache_key) if isinstance(cache, dict) else None
-
-        print(f"[{idx}/{len(targets)}] Humanizing {num} (praktijk={pr_need}, verdieping={vd_need}) …")
-
-        if cached and isinstance(cached, dict) and isinstance(cached.get("praktijk"), str) and isinstance(cached.get("verdieping"), str):
-            out_obj = cached
+        item_lines: List[str] = []
+        user_prompt = ""
+        if is_box_obj(cached):
+            results[num] = cached
         else:
-            # Retry a few times for robustness
-            last_err = None
-            out_obj = None
-            for attempt in range(1, 5):
-                try:
-                    resp = anthropic_messages(api_key, args.model, system, user_prompt, args.max_tokens, args.temperature)
-                    out_obj = parse_jsonish_object(resp)
-                    break
-                except Exception as e:
-                    last_err = e
-                    time.sleep(1.5 * attempt)
-            if out_obj is None:
-                raise RuntimeError(f"LLM failed for {num}: {last_err}")
+            pr_module = pr_modules[classify_praktijk_module(pr_current)] if pr_need else None
+            item_lines = build_item_lines(num, title, basis_context, pr_need, vd_need, pr_module, pr_current, vd_current)
+            user_prompt = build_user_prompt(item_lines)
+            legacy = cache.get(legacy_cache_key(str(args.chapter), num, user_prompt, args.model)) if isinstance(cache, dict) else None
+            if is_box_obj(legacy):
+                # Entry from an older cache file: reuse it and store it under the current key
+                results[num] = legacy
+                cache[cache_key] = legacy
+                migrated += 1
+        items.append(
+            {
+                "num": num,
+                "pr_need": pr_need,
+                "vd_need": vd_need,
+                "pr_host": pr_host,
+                "vd_host": vd_host,
+                "item_lines": item_lines,
+                "user_prompt": user_prompt,
+                "cache_key": cache_key,
+            }
+        )
+
+    if migrated:
+        save_cache()
+
+    # Pass 2: one LLM call per batch of uncached subparagraphs (amortizes per-request latency).
+    misses = [it for it in items if it["num"] not in results]
+    batch_size = max(1, int(args.batch_size))
+    for b0 in range(0, len(misses), batch_size):
+        batch = misses[b0 : b0 + batch_size]
+        nums = [it["num"] for it in batch]
+        print(f"[{b0 + len(batch)}/{len(misses)}] Humanizing {', '.join(nums)} …")
+        if len(batch) > 1:
+            try:
+                batch_tokens = min(args.max_tokens * len(batch), MAX_OUTPUT_TOKENS)
+                arr = call_llm(", ".join(nums), build_batch_prompt(batch), batch_tokens, parse_jsonish_array, retry_parse=False)
+            except (RuntimeError, FatalError) as e:
+                # A FatalError here may be specific to the batched request; the single calls below
+                # re-raise it if it is not.
+                print(f"  ⚠️ batch failed ({e}); falling back to single calls")
+                arr = []
+            by_num = {str(o.get("num") or "").strip(): o for o in arr if is_box_obj(o)}
+            for i, it in enumerate(batch):
+                o = by_num.get(it["num"])
+                if o is None and len(arr) == len(batch) and is_box_obj(arr[i]):
+                    o = arr[i]
+                if o is not None:
+                    results[it["num"]] = {"praktijk": o["praktijk"], "verdieping": o["verdieping"]}
+        for it in batch:
+            if it["num"] not in results:
+                results[it["num"]] = call_llm(it["num"], it["user_prompt"], args.max_tokens, parse_jsonish_object)
             if cache_path:
-                cache[cache_key] = out_obj
-                try:
-                    cache_path.parent.mkdir(parents=True, exist_ok=True)
-                    cache_path.write_text(json.dumps(cache, ensure_ascii=False, indent=2) + "\n", "utf-8")
-                except Exception:
-                    pass
+                cache[it["cache_key"]] = results[it["num"]]
+        save_cache()
+
+    # Pass 3: apply results back to hosts (in target order).
+    for it in items:
+        num = it["num"]
+        pr_need = it["pr_need"]
+        vd_need = it["vd_need"]
+        pr_host = it["pr_host"]
+        vd_host = it["vd_host"]
+        out_obj = results[num]
 
         pr_new = clean_box_text(str(out_obj.get("praktijk") or "")) if pr_need else ""
         vd_new = clean_box_text(str(out_obj.get("verdieping") or "")) if vd_need else ""
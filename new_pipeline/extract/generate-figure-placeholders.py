@@ -21,14 +21,25 @@ Options:
   --chapters "1,2,3"        Optional (default: all figure_manifest_ch*.json found)
   --out-dir <dir>           Optional (default: output/figure_placeholders/<book>/<runId>)
   --force                   Overwrite existing placeholder PNGs (default: skip existing)
+  --workers <n>             Optional render processes (default: CPU count; 1 = serial)
+  --oxipng                  Optional: write fast (level 1) PNGs, then recompress them with oxipng if on PATH
+  --max-render-side <px>    Optional: draw large placeholders at most this long side, then upscale (default: 0 = off)
 """
 
 from __future__ import annotations
 
 import argparse
+import functools
+import io
 import json
+import os
 import re
+import shutil
+import struct
+import subprocess
 import textwrap
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -36,8 +47,30 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from PIL import Image, ImageDraw, ImageFont
 
+try:
+    import orjson  # optional: much faster JSON load/dump
+except ImportError:
+    orjson = None
+
 
 RE_FIG = re.compile(r"^(Afbeelding|Figuur)\s+(\d+(?:\.\d+)?)", re.IGNORECASE)
+RE_FIG_CAPTION = re.compile(r"^(Afbeelding|Figuur)\s+(\d+(?:\.\d+)?)\s*:?\s*(.*)$", re.IGNORECASE)
+RE_WS = re.compile(r"\s+")
+RE_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9_.-]+")
+RE_FIGURE_MANIFEST = re.compile(r"^figure_manifest_ch(\d+)\.json$", re.IGNORECASE)
+
+
+def read_json(p: Path) -> Any:
+    if orjson is not None:
+        return orjson.loads(p.read_bytes())
+    return json.loads(p.read_text("utf-8"))
+
+
+def write_json(p: Path, obj: Any) -> None:
+    if orjson is not None:
+        p.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        p.write_text(json.dumps(obj, indent=2, ensure_ascii=False), "utf-8")
 
 
 def run_id_stamp() -> str:
@@ -66,14 +99,14 @@ def parse_csv_ints(s: str) -> List[int]:
 def normalize_ws(s: str) -> str:
     s = (s or "").replace("\u00ad", "")
     s = s.replace("\r\n", "\n").replace("\r", "\n")
-    s = re.sub(r"\s+", " ", s).strip()
+    s = RE_WS.sub(" ", s).strip()
     return s
 
 
 def to_safe_filename(s: str) -> str:
     s = normalize_ws(s)
     s = s.replace(" ", "_")
-    s = re.sub(r"[^A-Za-z0-9_.-]+", "", s)
+    s = RE_UNSAFE_FILENAME.sub("", s)
     return s or "figure"
 
 
@@ -86,7 +119,7 @@ def split_caption(label: str, body: str, raw: str) -> Tuple[str, str]:
             label = f"{label}:"
         return label, body
     if raw:
-        m = re.match(r"^(Afbeelding|Figuur)\s+(\d+(?:\.\d+)?)\s*:?\s*(.*)$", raw, flags=re.I)
+        m = RE_FIG_CAPTION.match(raw)
         if m:
             lab = f"{m.group(1)} {m.group(2)}:"
             return lab, normalize_ws(m.group(3) or "")
@@ -116,7 +149,7 @@ def resolve_repo_root() -> Path:
 def load_default_book_id(repo_root: Path) -> str:
     manifest_path = repo_root / "books" / "manifest.json"
     try:
-        m = json.loads(manifest_path.read_text("utf-8"))
+        m = read_json(manifest_path)
         books = m.get("books") or []
         if books and books[0].get("book_id"):
             return str(books[0]["book_id"])
@@ -128,7 +161,7 @@ def load_default_book_id(repo_root: Path) -> str:
 def list_figure_manifests(extract_dir: Path, chapters_filter: List[int]) -> List[Tuple[int, Path]]:
     out: List[Tuple[int, Path]] = []
     for p in sorted(extract_dir.glob("figure_manifest_ch*.json")):
-        m = re.match(r"^figure_manifest_ch(\d+)\.json$", p.name, flags=re.I)
+        m = RE_FIGURE_MANIFEST.match(p.name)
         if not m:
             continue
         ch = int(m.group(1))
@@ -142,7 +175,7 @@ def list_figure_manifests(extract_dir: Path, chapters_filter: List[int]) -> List
 def decode_link_path(link_path: str) -> str:
     p = str(link_path or "").strip()
     if p.startswith("file:"):
-        p = re.sub(r"^file:", "", p)
+        p = p[len("file:") :]
     try:
         from urllib.parse import unquote
 
@@ -154,13 +187,40 @@ def decode_link_path(link_path: str) -> str:
     return p
 
 
+@functools.lru_cache(maxsize=None)
+def dir_file_names(d: Path) -> frozenset:
+    # One scandir per directory instead of exists()+is_file() stats per figure candidate.
+    try:
+        with os.scandir(d) as it:
+            return frozenset(e.name for e in it if e.is_file())
+    except OSError:
+        return frozenset()
+
+
+def fold_name(name: str) -> str:
+    return unicodedata.normalize("NFC", name).casefold()
+
+
+@functools.lru_cache(maxsize=None)
+def dir_folded_names(d: Path) -> frozenset:
+    return frozenset(fold_name(n) for n in dir_file_names(d))
+
+
+def is_existing_file(p: Path) -> bool:
+    if p.name in dir_file_names(p.parent):
+        return True
+    # macOS (APFS/HFS+) matches names case- and normalization-insensitively, so link paths whose
+    # spelling differs from the name on disk still resolve there; let the filesystem decide.
+    return fold_name(p.name) in dir_folded_names(p.parent) and p.is_file()
+
+
 def load_chapter_image_map(repo_root: Path, chapter: int) -> Dict[str, str]:
     # new_pipeline/extract/chN-images-map.json is an array of {sourcePath, localPath}
     p = repo_root / "new_pipeline" / "extract" / f"ch{chapter}-images-map.json"
     if not p.exists():
         return {}
     try:
-        raw = json.loads(p.read_text("utf-8"))
+        raw = read_json(p)
         m: Dict[str, str] = {}
         for it in raw or []:
             src = str((it or {}).get("sourcePath") or "").strip()
@@ -172,30 +232,61 @@ def load_chapter_image_map(repo_root: Path, chapter: int) -> Dict[str, str]:
         return {}
 
 
-def try_load_font(size: int) -> ImageFont.ImageFont:
-    # Best-effort: use system fonts on macOS, fallback to PIL default.
-    candidates = [
-        "/System/Library/Fonts/Supplemental/Arial.ttf",
-        "/System/Library/Fonts/Supplemental/Helvetica.ttf",
-        "/Library/Fonts/Arial.ttf",
-        "/Library/Fonts/Helvetica.ttf",
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-    ]
-    for fp in candidates:
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def read_image_size(path: Path) -> Tuple[int, int]:
+    # PNG: width/height live in the IHDR chunk right after the signature (24 header bytes total),
+    # so there is no need to spin up a decoder. Anything else falls back to PIL's lazy open.
+    if path.suffix.lower() == ".png":
+        with open(path, "rb") as f:
+            head = f.read(24)
+        if len(head) == 24 and head[:8] == PNG_SIGNATURE and head[12:16] == b"IHDR":
+            w, h = struct.unpack(">II", head[16:24])
+            return int(w), int(h)
+    with Image.open(path) as im:
+        return im.size
+
+
+FONT_CANDIDATES = (
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+    "/System/Library/Fonts/Supplemental/Helvetica.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "/Library/Fonts/Helvetica.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
+
+@functools.lru_cache(maxsize=1)
+def resolve_font_path() -> str:
+    # Resolved once per process (first loadable candidate); "" means PIL default font.
+    for fp in FONT_CANDIDATES:
         p = Path(fp)
         if p.exists():
             try:
-                return ImageFont.truetype(str(p), size=size)
+                ImageFont.truetype(str(p), size=12)
+                return str(p)
             except Exception:
                 pass
-    try:
-        return ImageFont.load_default()
-    except Exception:
-        return ImageFont.load_default()
+    return ""
+
+
+@functools.lru_cache(maxsize=None)
+def try_load_font(size: int) -> ImageFont.ImageFont:
+    # Best-effort: use system fonts on macOS, fallback to PIL default.
+    # Cached per size: FreeType face construction is the expensive part of text rendering.
+    fp = resolve_font_path()
+    if fp:
+        try:
+            return ImageFont.truetype(fp, size=size)
+        except Exception:
+            pass
+    return ImageFont.load_default()
 
 
+@functools.lru_cache(maxsize=4096)
 def text_bbox(font: ImageFont.ImageFont, text: str) -> Tuple[int, int]:
-    # returns (w, h)
+    # returns (w, h); cached because fonts are shared (try_load_font) and headers/marks repeat
     if not text:
         return (0, 0)
     try:
@@ -206,65 +297,151 @@ def text_bbox(font: ImageFont.ImageFont, text: str) -> Tuple[int, int]:
         return font.getsize(text)
 
 
+@functools.lru_cache(maxsize=64)
+def space_width(font: ImageFont.ImageFont) -> int:
+    # Advance width of a space (its bbox has no ink, so text_bbox would report 0).
+    try:
+        return int(round(font.getlength(" ")))
+    except Exception:
+        return text_bbox(font, "x x")[0] - text_bbox(font, "xx")[0]
+
+
+def junction_slack(font: ImageFont.ImageFont) -> int:
+    # How far a word-sum line width may drift from the real line bbox per word gap
+    # (side bearings and kerning at the word edges); a few pixels at most in practice.
+    return int(getattr(font, "size", 16)) // 4 + 2
+
+
 def wrap_text(font: ImageFont.ImageFont, text: str, max_width: int) -> List[str]:
+    # Line width is estimated from per-word widths (cached in text_bbox) + space advances,
+    # so most words are measured once instead of re-measuring the growing candidate line.
+    # Near max_width the estimate is not exact, so there the candidate line bbox decides.
     text = normalize_ws(text or "")
     if not text:
         return []
     words = text.split(" ")
+    sp = space_width(font)
     lines: List[str] = []
     cur: List[str] = []
+    cur_w = 0
     for w in words:
-        cand = (" ".join(cur + [w])).strip()
-        if not cand:
+        if not w:
             continue
-        if text_bbox(font, cand)[0] <= max_width:
+        ww = text_bbox(font, w)[0]
+        cand_w = cur_w + sp + ww if cur else ww
+        if cur and abs(cand_w - max_width) <= len(cur) * junction_slack(font):
+            fits = text_bbox(font, " ".join(cur) + " " + w)[0] <= max_width
+        else:
+            fits = cand_w <= max_width
+        if fits:
             cur.append(w)
+            cur_w = cand_w
             continue
         if cur:
             lines.append(" ".join(cur))
             cur = [w]
+            cur_w = ww
         else:
             # single long word; hard wrap
-            lines.append(cand)
+            lines.append(w)
             cur = []
+            cur_w = 0
     if cur:
         lines.append(" ".join(cur))
     return lines
 
 
+PH_BG = (245, 245, 245)
+PH_BORDER = (170, 170, 170)
+PH_INK = (40, 40, 40)
+PH_INK2 = (80, 80, 80)
+PH_DIAG = (220, 220, 220)
+
+
+def make_background(w: int, h: int) -> Image.Image:
+    # Border + diagonal cross. Not cached: exact (w, h) rarely repeats across figures, and a
+    # cached full-size canvas costs a copy per use plus tens of MB per worker process.
+    img = Image.new("RGB", (w, h), PH_BG)
+    d = ImageDraw.Draw(img)
+
+    bw = max(2, int(min(w, h) * 0.006))
+    # One call draws the full thick border (inward from the edge), instead of bw nested rectangles.
+    d.rectangle([0, 0, w - 1, h - 1], outline=PH_BORDER, width=bw)
+
+    # Diagonal cross (helps spot aspect ratio quickly)
+    d.line([0, 0, w - 1, h - 1], fill=PH_DIAG, width=max(2, bw))
+    d.line([0, h - 1, w - 1, 0], fill=PH_DIAG, width=max(2, bw))
+    return img
+
+
+def text_mask(font: ImageFont.ImageFont, text: str) -> Tuple[Image.Image, Tuple[int, int]]:
+    # Rasterize a line into an "L" coverage mask; returns (mask, offset of the ink box
+    # relative to the draw origin).
+    b = font.getbbox(text)
+    mask = Image.new("L", (max(1, b[2] - b[0]), max(1, b[3] - b[1])), 0)
+    ImageDraw.Draw(mask).text((-b[0], -b[1]), text, font=font, fill=255)
+    return mask, (b[0], b[1])
+
+
+# Only the short lines that can repeat (header, ID line, PLACEHOLDER mark) are memoized;
+# wrapped caption lines almost never repeat and would only fill the cache with wide masks.
+cached_text_mask = functools.lru_cache(maxsize=64)(text_mask)
+
+
+def paste_text(
+    img: Image.Image,
+    xy: Tuple[int, int],
+    text: str,
+    font: ImageFont.ImageFont,
+    color: Tuple[int, int, int],
+    cached: bool = False,
+) -> None:
+    # Same result as ImageDraw.text(xy, text, font=font, fill=color), via a coverage mask.
+    mask, (ox, oy) = (cached_text_mask if cached else text_mask)(font, text)
+    img.paste(color, (xy[0] + ox, xy[1] + oy, xy[0] + ox + mask.width, xy[1] + oy + mask.height), mask)
+
+
+def quantize_font_size(s: float) -> int:
+    # Round to the nearest multiple of 4px so figures share a handful of cached font objects.
+    return max(8, (int(s) + 2) & ~3)
+
+
 def draw_placeholder(
     size: Tuple[int, int],
     figure_label: str,
     figure_id: str,
     caption: str,
+    max_render_side: int = 0,
 ) -> Image.Image:
+    """
+    Render a placeholder of exactly `size` pixels.
+
+    Font sizes scale with the image but are quantized to multiples of 4px (at most 2px off the
+    unquantized size), which keeps the font cache small across thousands of figures.
+
+    If `max_render_side` > 0 and the long side exceeds it, the placeholder is drawn at that
+    reduced size and upscaled (nearest neighbour) to `size`: cheaper to draw, blockier text.
+    """
     w, h = size
     w = max(8, int(w))
     h = max(8, int(h))
 
-    # Background + border
-    bg = (245, 245, 245, 255)
-    border = (170, 170, 170, 255)
-    ink = (40, 40, 40, 255)
-    ink2 = (80, 80, 80, 255)
-    diag = (220, 220, 220, 255)
+    if max_render_side > 0 and max(w, h) > max_render_side:
+        scale = max_render_side / max(w, h)
+        small = draw_placeholder((int(w * scale), int(h * scale)), figure_label, figure_id, caption)
+        return small.resize((w, h), Image.NEAREST)
 
-    img = Image.new("RGBA", (w, h), bg)
-    d = ImageDraw.Draw(img)
+    ink = PH_INK
+    ink2 = PH_INK2
 
-    bw = max(2, int(min(w, h) * 0.006))
-    for i in range(bw):
-        d.rectangle([i, i, w - 1 - i, h - 1 - i], outline=border)
-
-    # Diagonal cross (helps spot aspect ratio quickly)
-    d.line([0, 0, w - 1, h - 1], fill=diag, width=max(2, bw))
-    d.line([0, h - 1, w - 1, 0], fill=diag, width=max(2, bw))
+    # Background + border
+    img = make_background(w, h)
 
     # Font sizes relative to image size
     base = max(14, int(min(w, h) * 0.05))
-    title_size = max(18, min(92, int(base * 1.35)))
-    body_size = max(14, min(64, int(base * 0.95)))
-    small_size = max(12, min(44, int(base * 0.75)))
+    title_size = quantize_font_size(max(18, min(92, int(base * 1.35))))
+    body_size = quantize_font_size(max(14, min(64, int(base * 0.95))))
+    small_size = quantize_font_size(max(12, min(44, int(base * 0.75))))
 
     f_title = try_load_font(title_size)
     f_body = try_load_font(body_size)
@@ -284,32 +461,64 @@ def draw_placeholder(
 
     cap_lines = wrap_text(f_body, cap_norm, max_text_w)[:6]  # avoid huge blocks
 
-    lines: List[Tuple[str, ImageFont.ImageFont, Tuple[int, int, int, int]]] = []
-    lines.append((header, f_title, ink))
+    # (text, font, color, cache the rendered mask)
+    lines: List[Tuple[str, ImageFont.ImageFont, Tuple[int, int, int], bool]] = []
+    lines.append((header, f_title, ink, True))
     if sub:
-        lines.append((sub, f_small, ink2))
+        lines.append((sub, f_small, ink2, True))
     for cl in cap_lines:
-        lines.append((cl, f_body, ink))
+        lines.append((cl, f_body, ink, False))
 
     # Compute total height
     spacing = max(6, int(body_size * 0.35))
-    heights = [text_bbox(font, txt)[1] for (txt, font, _c) in lines if txt]
+    heights = [text_bbox(font, txt)[1] for (txt, font, _c, _m) in lines if txt]
     total_h = sum(heights) + spacing * max(0, len(heights) - 1)
 
     y0 = max(margin, int((h - total_h) / 2))
     y = y0
-    for (txt, font, color) in lines:
+    for (txt, font, color, cached) in lines:
         if not txt:
             continue
         tw, th = text_bbox(font, txt)
         x = int((w - tw) / 2)
-        d.text((x, y), txt, font=font, fill=color)
+        paste_text(img, (x, y), txt, font, color, cached)
         y += th + spacing
 
     # Top-left mark
-    d.text((margin // 2, margin // 3), top_left, font=f_small, fill=ink2)
+    paste_text(img, (margin // 2, margin // 3), top_left, f_small, ink2, cached=True)
+
+    return img
+
 
-    return img.convert("RGB")  # keep PNG smaller; no alpha needed
+def render_placeholder_file(
+    asset_abs: str,
+    out_abs: str,
+    label: str,
+    figure_id: str,
+    body: str,
+    compress_level: int = 6,
+    max_render_side: int = 0,
+) -> Tuple[int, int]:
+    # Top-level (picklable) so it can run in a ProcessPoolExecutor worker.
+    w, h = read_image_size(Path(asset_abs))
+    ph = draw_placeholder((w, h), label, figure_id, body, max_render_side)
+    # Placeholders are flat synthetic images: optimize=True buys little size for a lot of encoder CPU.
+    # Encode in memory and write the file in one call: no chunked encoder writes to disk, and a much
+    # smaller window for an interrupted run to leave a half-written PNG (skipped as existing next run).
+    buf = io.BytesIO()
+    ph.save(buf, format="PNG", compress_level=compress_level)
+    Path(out_abs).write_bytes(buf.getbuffer())
+    return w, h
+
+
+def oxipng_optimize(exe: str, paths: List[str], workers: int) -> Optional[str]:
+    # oxipng is multi-threaded; one invocation per chunk of files (keeps argv bounded).
+    for i in range(0, len(paths), 256):
+        cmd = [exe, "--opt", "2", "--quiet", "--threads", str(max(1, workers)), *paths[i : i + 256]]
+        r = subprocess.run(cmd, capture_output=True, text=True)
+        if r.returncode != 0:
+            return (r.stderr or r.stdout or f"oxipng exited with {r.returncode}").strip()
+    return None
 
 
 def main() -> None:
@@ -321,6 +530,9 @@ def main() -> None:
     ap.add_argument("--chapters", default="")
     ap.add_argument("--out-dir", default="")
     ap.add_argument("--force", action="store_true")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--oxipng", action="store_true")
+    ap.add_argument("--max-render-side", type=int, default=0)
     args = ap.parse_args()
 
     book_id = str(args.book).strip() or default_book
@@ -342,17 +554,31 @@ def main() -> None:
     skipped_exists = 0
     missing_source = 0
     errors: List[Dict[str, str]] = []
+    # Render jobs are collected first and executed in parallel; each keeps its slot in `results`
+    # so the manifest order matches the figure order.
+    jobs: List[Tuple[int, str, str, str, str, str, int, int]] = []
+    # With --oxipng (and oxipng installed), PIL only does a fast level-1 encode; oxipng recompresses afterwards.
+    oxipng_exe = shutil.which("oxipng") if args.oxipng else None
+    if args.oxipng and not oxipng_exe:
+        print("⚠️ --oxipng: oxipng not found on PATH; using PIL compression only")
+    compress_level = 1 if oxipng_exe else 6
 
     chapter_maps: Dict[int, Dict[str, str]] = {}
 
     for (ch, mf_path) in manifests:
-        data = json.loads(mf_path.read_text("utf-8"))
+        data = read_json(mf_path)
         figures = data.get("figures") or []
         if ch not in chapter_maps:
             chapter_maps[ch] = load_chapter_image_map(repo_root, ch)
 
         ch_dir = out_placeholders / f"ch{ch}"
         ch_dir.mkdir(parents=True, exist_ok=True)
+        # Output names already on disk (unless --force) plus those queued below, so a duplicate
+        # figure_id is skipped instead of being rendered to the same file by two workers.
+        existing_out: set = set()
+        if not args.force:
+            with os.scandir(ch_dir) as it:
+                existing_out = {e.name for e in it if e.is_file()}
 
         for fig in figures:
             # Resolve source image path (for dimensions):
@@ -372,7 +598,7 @@ def main() -> None:
             asset_rel_for_manifest = ""
             if asset_rel:
                 p = (repo_root / asset_rel) if not Path(asset_rel).is_absolute() else Path(asset_rel)
-                if p.exists() and p.is_file():
+                if is_existing_file(p):
                     asset_abs = p
                     asset_rel_for_manifest = asset_rel
             if asset_abs is None:
@@ -384,23 +610,23 @@ def main() -> None:
                     local = chapter_maps.get(ch, {}).get(decoded)
                     if local:
                         p2 = (repo_root / local)
-                        if p2.exists() and p2.is_file():
+                        if is_existing_file(p2):
                             asset_abs = p2
                             asset_rel_for_manifest = str(local).replace("\\", "/")
                     if asset_abs is None:
                         p3 = Path(decoded)
-                        if p3.exists() and p3.is_file():
+                        if is_existing_file(p3):
                             asset_abs = p3
                             asset_rel_for_manifest = str(p3)
             if asset_abs is None:
                 # last resort: derive from figure_id (matches atomic export naming when available)
                 guess = repo_root / "new_pipeline" / "assets" / "figures" / f"ch{ch}" / f"{figure_id}.png"
-                if guess.exists() and guess.is_file():
+                if is_existing_file(guess):
                     asset_abs = guess
                     asset_rel_for_manifest = str(guess.relative_to(repo_root)).replace("\\", "/")
 
             out_abs = ch_dir / f"{figure_id}.png"
-            if out_abs.exists() and not args.force:
+            if out_abs.name in existing_out:
                 skipped_exists += 1
                 results.append(
                     {
@@ -418,33 +644,62 @@ def main() -> None:
                 )
                 continue
 
-            if asset_abs is None or not asset_abs.exists() or not asset_abs.is_file():
+            if asset_abs is None:
                 missing_source += 1
                 errors.append({"chapter": str(ch), "figure_id": figure_id, "error": f"missing source image: {asset_abs}"})
                 continue
 
+            results.append(
+                {
+                    "book_id": book_id,
+                    "chapter": str(ch),
+                    "figure_id": figure_id,
+                    "label": label,
+                    "caption": body,
+                    "source_asset_path": asset_rel_for_manifest or asset_rel.replace("\\", "/"),
+                    "source_asset_abs": str(asset_abs),
+                    "placeholder_path": str(out_abs.relative_to(repo_root)).replace("\\", "/"),
+                    "placeholder_abs": str(out_abs),
+                }
+            )
+            jobs.append((len(results) - 1, str(asset_abs), str(out_abs), label, figure_id, body, compress_level, max(0, int(args.max_render_side))))
+            existing_out.add(out_abs.name)
+
+    failed: set = set()
+
+    def on_done(slot: int, size: Optional[Tuple[int, int]], err: Optional[Exception]) -> None:
+        nonlocal rendered
+        entry = results[slot]
+        if err is not None:
+            failed.add(slot)
+            errors.append({"chapter": entry["chapter"], "figure_id": entry["figure_id"], "error": str(err)})
+            return
+        rendered += 1
+        entry["size"] = list(size or (0, 0))
+
+    workers = max(1, int(args.workers))
+    if workers == 1 or len(jobs) <= 1:
+        for (slot, *job) in jobs:
             try:
-                with Image.open(asset_abs) as im:
-                    w, h = im.size
-                ph = draw_placeholder((w, h), label, figure_id, body)
-                ph.save(out_abs, format="PNG", optimize=True)
-                rendered += 1
-                results.append(
-                    {
-                        "book_id": book_id,
-                        "chapter": str(ch),
-                        "figure_id": figure_id,
-                        "label": label,
-                        "caption": body,
-                        "source_asset_path": asset_rel_for_manifest or asset_rel.replace("\\", "/"),
-                        "source_asset_abs": str(asset_abs),
-                        "placeholder_path": str(out_abs.relative_to(repo_root)).replace("\\", "/"),
-                        "placeholder_abs": str(out_abs),
-                        "size": [w, h],
-                    }
-                )
+                on_done(slot, render_placeholder_file(*job), None)
             except Exception as e:
-                errors.append({"chapter": str(ch), "figure_id": figure_id, "error": str(e)})
+                on_done(slot, None, e)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = {pool.submit(render_placeholder_file, *job): slot for (slot, *job) in jobs}
+            for fut in as_completed(futures):
+                try:
+                    on_done(futures[fut], fut.result(), None)
+                except Exception as e:
+                    on_done(futures[fut], None, e)
+    if failed:
+        results = [r for i, r in enumerate(results) if i not in failed]
+
+    if oxipng_exe:
+        written = [out_abs for (slot, _src, out_abs, *_rest) in jobs if slot not in failed]
+        err = oxipng_optimize(oxipng_exe, written, workers) if written else None
+        if err:
+            print(f"⚠️ oxipng pass failed: {err}")
 
     manifest_out = {
         "book_id": book_id,
@@ -457,7 +712,7 @@ def main() -> None:
         "errors": errors[:200],
         "figures": results,
     }
-    (out_root / "placeholders.manifest.json").write_text(json.dumps(manifest_out, indent=2, ensure_ascii=False), "utf-8")
+    write_json(out_root / "placeholders.manifest.json", manifest_out)
 
     print(f"✅ Placeholders done: rendered={rendered} skipped_exists={skipped_exists} missing_source={missing_source}")
     print(f"Output folder: {out_root}")
@@ -3,28 +3,49 @@
 Extract figure captions from VTH N4 PDF and add them to the canonical JSON.
 """
 import fitz
-import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from canonical_json import dump_json, load_json
+
 REPO_ROOT = Path(__file__).resolve().parents[2]
 PDF_PATH = REPO_ROOT / "new_pipeline" / "output" / "highres_exports" / "MBO_VTH_N4_2024_HIGHRES.pdf"
 CANONICAL_IN = REPO_ROOT / "new_pipeline" / "output" / "_canonical_jsons_all" / "VTH_N4__canonical_vth_n4_full_30ch.with_figures.json"
 CANONICAL_OUT = REPO_ROOT / "new_pipeline" / "output" / "_canonical_jsons_all" / "VTH_N4__canonical_vth_n4_full_30ch.with_figures.with_captions.json"
 
-def extract_captions_from_pdf():
-    """Extract figure captions from the PDF."""
-    doc = fitz.open(str(PDF_PATH))
+RE_CAPTION = re.compile(
+    r'Afbeelding\s+(\d+)\.(\d+)\s*[:\.]?\s*([^\n]+(?:\n(?![A-Z0-9]|\d+\.\d+)[^\n]+)?)',
+    re.IGNORECASE
+)
+RE_WS = re.compile(r'\s+')
+RE_FIGNUM = re.compile(r'(\d+\.\d+)')
+
+def merge_captions(captions, found):
+    """Keep the longest caption per figure key (first one wins on ties)."""
+    for fig_key, caption_text in found.items():
+        if fig_key not in captions or len(caption_text) > len(captions[fig_key]):
+            captions[fig_key] = caption_text
+
+def extract_captions_from_pages(pdf_path, start, stop):
+    """Extract figure captions from pages [start, stop). Opens its own document (safe per process)."""
+    doc = fitz.open(str(pdf_path))
     captions = {}
     
-    for page_num in range(doc.page_count):
+    for page_num in range(start, min(stop, doc.page_count)):
         page = doc[page_num]
-        text = page.get_text("text")
+        # Text blocks: (x0, y0, x1, y1, text, block_no, block_type); block_type 1 is an image.
+        # Cheaper than reflowing the whole page, and blocks without "Afbeelding" are skipped
+        # before the regex runs.
+        blocks = page.get_text("blocks")
         
         # Find "Afbeelding X.Y caption..." patterns
-        matches = re.finditer(
-            r'Afbeelding\s+(\d+)\.(\d+)\s*[:\.]?\s*([^\n]+(?:\n(?![A-Z0-9]|\d+\.\d+)[^\n]+)?)',
-            text, re.IGNORECASE
+        matches = (
+            m
+            for b in blocks
+            if b[6] == 0 and 'afbeelding' in b[4].lower()
+            for m in RE_CAPTION.finditer(b[4])
         )
         
         for match in matches:
@@ -33,8 +54,8 @@ def extract_captions_from_pdf():
             caption_text = match.group(3).strip()
             
             # Clean up caption
-            caption_text = re.sub(r'\s+', ' ', caption_text)
-            caption_text = re.sub(r'­', '', caption_text)  # Remove soft hyphens
+            caption_text = RE_WS.sub(' ', caption_text)
+            caption_text = caption_text.replace('\u00ad', '')  # Remove soft hyphens
             
             fig_key = f"{ch_num}.{fig_num}"
             
@@ -46,10 +67,26 @@ def extract_captions_from_pdf():
     doc.close()
     return captions
 
+def extract_captions_from_pdf(workers=None):
+    """Extract figure captions from the PDF, scanning contiguous page ranges in worker processes."""
+    with fitz.open(str(PDF_PATH)) as doc:
+        page_count = doc.page_count
+    workers = max(1, min(workers or os.cpu_count() or 1, page_count))
+    if workers == 1:
+        return extract_captions_from_pages(PDF_PATH, 0, page_count)
+    
+    step = -(-page_count // workers)
+    ranges = [(i, min(i + step, page_count)) for i in range(0, page_count, step)]
+    captions = {}
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        # Merge in page order so ties resolve exactly as in a serial scan
+        for found in pool.map(extract_captions_from_pages, [PDF_PATH] * len(ranges), *zip(*ranges)):
+            merge_captions(captions, found)
+    return captions
+
 def update_canonical_with_captions(captions):
     """Update the canonical JSON with extracted captions."""
-    with open(CANONICAL_IN, 'r', encoding='utf-8') as f:
-        book = json.load(f)
+    book = load_json(CANONICAL_IN)
     
     updated_count = 0
     for chapter in book['chapters']:
@@ -57,20 +94,28 @@ def update_canonical_with_captions(captions):
             for block in section.get('content', []):
                 if not isinstance(block, dict):
                     continue
-                for img in block.get('images', []):
+                images = block.get('images')
+                if not images:
+                    continue
+                for img in images:
                     fig_number = img.get('figureNumber', '')
-                    match = re.search(r'(\d+\.\d+)', fig_number)
-                    if match:
+                    # Fast path: figureNumber is usually already the bare "X.Y" caption key
+                    if fig_number in captions:
+                        fig_key = fig_number
+                    else:
+                        match = RE_FIGNUM.search(fig_number)
+                        if not match:
+                            continue
                         fig_key = match.group(1)
-                        if fig_key in captions:
-                            old_caption = img.get('caption', '')
-                            new_caption = captions[fig_key]
-                            if not old_caption or len(new_caption) > len(old_caption):
-                                img['caption'] = new_caption
-                                updated_count += 1
+                    new_caption = captions.get(fig_key)
+                    if new_caption is None:
+                        continue
+                    old_caption = img.get('caption', '')
+                    if not old_caption or len(new_caption) > len(old_caption):
+                        img['caption'] = new_caption
+                        updated_count += 1
     
-    with open(CANONICAL_OUT, 'w', encoding='utf-8') as f:
-        json.dump(book, f, indent=2, ensure_ascii=False)
+    dump_json(CANONICAL_OUT, book)
     
     return book, updated_count
 
@@ -6,14 +6,21 @@ Outputs coverage stats for body text, list items, headings, and figures.
 from __future__ import annotations
 
 import argparse
+import functools
 import json
+import os
 import re
 import zipfile
-from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 from lxml import etree
 
+try:
+    import orjson  # optional: much faster JSON load/dump
+except ImportError:
+    orjson = None
+
 
 REPO_ROOT = Path(__file__).parent.parent.parent
 IDML_DIR = REPO_ROOT / "designs-relinked" / "MBO Pathologie nivo 4_9789083412016_03"
@@ -43,127 +50,190 @@ STYLE_MAPPING = {
 }
 
 
+# First-match-in-order semantics (like iterating STYLE_MAPPING): each alternative is a lookahead
+# from the start of the name, tried in mapping order; `lastgroup` tells which pattern hit.
+STYLE_TYPES_BY_GROUP = list(STYLE_MAPPING.values())
+STYLE_RE = re.compile(
+    "^(?:" + "|".join(f"(?=.*?(?P<g{i}>{re.escape(pat)}))" for i, pat in enumerate(STYLE_MAPPING)) + ")",
+    re.DOTALL,
+)
+STYLE_FALLBACKS = (
+    ("chapter header", "section_h1"),
+    ("subchapter header", "section_h2"),
+    ("basis|body|tabel", "body"),
+    ("bullet|nummer", "list_item"),
+    ("caption|bijschrift", "caption"),
+    ("voetregel|inhoudsopgave", "skip"),
+)
+STYLE_FALLBACK_TYPES_BY_GROUP = [content_type for _pat, content_type in STYLE_FALLBACKS]
+STYLE_FALLBACK_RE = re.compile(
+    "^(?:" + "|".join(f"(?=.*?(?P<f{i}>{pat}))" for i, (pat, _t) in enumerate(STYLE_FALLBACKS)) + ")",
+    re.DOTALL,
+)
+
+# Every type get_style_type can return apart from "skip": per-chapter counters start at 0 for each.
+STYLE_TYPES = tuple(
+    dict.fromkeys(
+        t for t in (*STYLE_MAPPING.values(), *STYLE_FALLBACK_TYPES_BY_GROUP, "body") if t != "skip"
+    )
+)
+
+
+def match_style_type(style_name: str) -> str:
+    m = STYLE_RE.match(style_name)
+    if m:
+        return STYLE_TYPES_BY_GROUP[int(m.lastgroup[1:])]
+    m = STYLE_FALLBACK_RE.match(style_name.lower())
+    if m:
+        return STYLE_FALLBACK_TYPES_BY_GROUP[int(m.lastgroup[1:])]
+    return "body"
+
+
+# Exact (stripped) style names hit this dict first. Values come from match_style_type itself,
+# so a key that an earlier substring pattern would claim still resolves the same way.
+EXACT_STYLES = {name: match_style_type(name) for name in STYLE_MAPPING}
+
+
+@functools.lru_cache(maxsize=4096)
 def get_style_type(style: str) -> str:
     if not style:
         return "body"
     style_name = style.replace("ParagraphStyle/", "")
-    for pat, content_type in STYLE_MAPPING.items():
-        if pat in style_name:
-            return content_type
-    style_lower = style_name.lower()
-    if "chapter header" in style_lower:
-        return "section_h1"
-    if "subchapter header" in style_lower:
-        return "section_h2"
-    if "basis" in style_lower or "body" in style_lower or "tabel" in style_lower:
-        return "body"
-    if "bullet" in style_lower or "nummer" in style_lower:
-        return "list_item"
-    if "caption" in style_lower or "bijschrift" in style_lower:
-        return "caption"
-    if "voetregel" in style_lower or "inhoudsopgave" in style_lower:
-        return "skip"
-    return "body"
+    content_type = EXACT_STYLES.get(style_name)
+    if content_type is not None:
+        return content_type
+    return match_style_type(style_name)
+
 
+RE_SOFT_HYPHEN_BOM = re.compile("[\xad\ufeff]")
+RE_SPACE_BEFORE_PUNCT = re.compile(r"\s+([,.])")
 
+
+@functools.lru_cache(maxsize=None)
 def clean_text(text: str) -> str:
     if not text:
         return ""
-    text = text.replace("\xad", "").replace("­", "").replace("\ufeff", "")
+    text = RE_SOFT_HYPHEN_BOM.sub("", text)
     text = " ".join(text.split())
-    text = text.replace(" ,", ",").replace(" .", ".")
-    return text
+    return RE_SPACE_BEFORE_PUNCT.sub(r"\1", text)
+
+
+# `[\W_]` is exactly the complement of str.isalnum(); runs collapse to one space.
+RE_NON_ALNUM = re.compile(r"[\W_]+")
 
 
+@functools.lru_cache(maxsize=None)
 def normalize(text: str) -> str:
-    text = text.lower()
-    chars: list[str] = []
-    for ch in text:
-        if ch.isalnum():
-            chars.append(ch)
-        else:
-            chars.append(" ")
-    return " ".join("".join(chars).split())
+    return RE_NON_ALNUM.sub(" ", text.lower()).strip(" ")
+
+
+RE_FIG_NUMBER = re.compile(r"^(?:Afbeelding|Figuur)\s+(\d+(?:\.\d+)*)", re.IGNORECASE)
 
 
 def extract_fig_number(text: str) -> str | None:
-    match = re.match(r"^(Afbeelding|Figuur)\s+(\d+(?:\.\d+)*)", text, re.IGNORECASE)
+    match = RE_FIG_NUMBER.match(text)
     if match:
-        return match.group(2)
+        return match.group(1)
     return None
 
 
 def load_canonical(canon_path: Path):
-    with canon_path.open("r", encoding="utf-8") as f:
-        canon = json.load(f)
-    canon_paras = set()
-    canon_list_items = set()
-    canon_titles = set()
-    canon_figs = set()
-    for ch in canon.get("chapters", []):
-        for sec in ch.get("sections", []):
-            title = sec.get("title") or ""
-            raw_title = sec.get("raw_title") or ""
-            if title:
-                canon_titles.add(normalize(title))
-                number = sec.get("number")
-                if number:
-                    canon_titles.add(normalize(f"{number} {title}"))
-            if raw_title:
-                canon_titles.add(normalize(raw_title))
-            for block in sec.get("content", []):
-                if block.get("type") == "paragraph":
-                    canon_paras.add(normalize(block.get("text", "")))
-                elif block.get("type") == "list":
-                    for item in block.get("items", []):
-                        canon_list_items.add(normalize(item))
-                elif block.get("type") == "list_item":
-                    canon_list_items.add(normalize(block.get("text", "")))
-                elif block.get("type") == "figure":
-                    num = block.get("number")
-                    if num:
-                        canon_figs.add(num)
-    return canon, canon_paras, canon_list_items, canon_titles, canon_figs
-
-
-def analyze_idml():
-    idml_stats = defaultdict(Counter)
+    if orjson is not None:
+        canon = orjson.loads(canon_path.read_bytes())
+    else:
+        with canon_path.open("r", encoding="utf-8") as f:
+            canon = json.load(f)
+    sections = [sec for ch in canon.get("chapters", []) for sec in ch.get("sections", [])]
+    blocks = [block for sec in sections for block in sec.get("content", [])]
+
+    titled = [sec for sec in sections if sec.get("title")]
+    canon_titles = set(normalize(sec["title"]) for sec in titled)
+    canon_titles.update(normalize(f"{sec['number']} {sec['title']}") for sec in titled if sec.get("number"))
+    canon_titles.update(normalize(sec["raw_title"]) for sec in sections if sec.get("raw_title"))
+
+    canon_paras = frozenset(normalize(b.get("text", "")) for b in blocks if b.get("type") == "paragraph")
+    canon_list_items = set(
+        normalize(item) for b in blocks if b.get("type") == "list" for item in b.get("items", [])
+    )
+    canon_list_items.update(normalize(b.get("text", "")) for b in blocks if b.get("type") == "list_item")
+    canon_figs = frozenset(
+        b.get("number") for b in blocks if b.get("type") == "figure" and b.get("number")
+    )
+    return canon, canon_paras, frozenset(canon_list_items), frozenset(canon_titles), canon_figs
+
+
+PSR_XPATH = etree.XPath("//ParagraphStyleRange")
+# Stories carry no xml:id lookups and whitespace-only nodes between tags are never read.
+STORY_PARSER = etree.XMLParser(huge_tree=True, collect_ids=False, remove_blank_text=True)
+
+
+def _analyze_one_idml(ch_num: int, idml_path: Path):
+    # Top-level (picklable) so each chapter can be parsed in a ProcessPoolExecutor worker.
+    stats = dict.fromkeys(STYLE_TYPES, 0)
+    body: list[str] = []
+    list_items: list[str] = []
+    titles: list[str] = []
+    figs: set[str] = set()
+    with zipfile.ZipFile(idml_path, "r") as zf:
+        for info in zf.infolist():
+            if not (info.filename.startswith("Stories/Story_") and info.filename.endswith(".xml")):
+                continue
+            root = etree.fromstring(zf.read(info), STORY_PARSER)
+            for psr in PSR_XPATH(root):
+                style = psr.get("AppliedParagraphStyle", "")
+                st = get_style_type(style)
+                if st == "skip":
+                    continue
+                # Only each Content's own leading .text, as before: no tails, no text after <?ACE?> PIs
+                text = clean_text(" ".join(psr.itertext("Content", with_tail=False)))
+                if not text:
+                    continue
+                stats[st] += 1
+                if st == "body":
+                    body.append(text)
+                elif st == "list_item":
+                    list_items.append(text)
+                elif st in ("section_h1", "section_h2", "section_h3"):
+                    titles.append(text)
+                elif st == "caption":
+                    fig_num = extract_fig_number(text)
+                    if fig_num:
+                        figs.add(fig_num)
+    return ch_num, stats, body, list_items, titles, figs
+
+
+def analyze_idml(workers=None):
+    idml_stats: dict[int, dict[str, int]] = {}
     all_body: list[str] = []
     all_list: list[str] = []
     all_titles: list[str] = []
     all_figs: set[str] = set()
 
+    chapters = []
     for ch_num in range(1, 13):
         idml_path = IDML_DIR / f"Pathologie_mbo_CH{ch_num:02d}_03.2024.idml"
-        if not idml_path.exists():
-            continue
-        with zipfile.ZipFile(idml_path, "r") as zf:
-            for story_file in [f for f in zf.namelist() if f.startswith("Stories/Story_") and f.endswith(".xml")]:
-                with zf.open(story_file) as f:
-                    tree = etree.parse(f)
-                    for psr in tree.xpath("//ParagraphStyleRange"):
-                        style = psr.get("AppliedParagraphStyle", "")
-                        st = get_style_type(style)
-                        if st == "skip":
-                            continue
-                        text_parts = []
-                        for content_el in psr.xpath(".//Content"):
-                            if content_el.text:
-                                text_parts.append(content_el.text)
-                        text = clean_text(" ".join(text_parts))
-                        if not text:
-                            continue
-                        idml_stats[ch_num][st] += 1
-                        if st == "body":
-                            all_body.append(text)
-                        elif st == "list_item":
-                            all_list.append(text)
-                        elif st in ("section_h1", "section_h2", "section_h3"):
-                            all_titles.append(text)
-                        elif st == "caption":
-                            fig_num = extract_fig_number(text)
-                            if fig_num:
-                                all_figs.add(fig_num)
+        if idml_path.exists():
+            chapters.append((ch_num, idml_path))
+    if not chapters:
+        return idml_stats, all_body, all_list, all_titles, all_figs
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chapters)))
+    ch_nums = [ch_num for ch_num, _ in chapters]
+    paths = [idml_path for _, idml_path in chapters]
+    if workers == 1:
+        results = list(map(_analyze_one_idml, ch_nums, paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_analyze_one_idml, ch_nums, paths))
+
+    # map() keeps chapter order, so the merged lists match a serial run.
+    for ch_num, stats, body, list_items, titles, figs in results:
+        if any(stats.values()):
+            idml_stats[ch_num] = stats
+        all_body.extend(body)
+        all_list.extend(list_items)
+        all_titles.extend(titles)
+        all_figs.update(figs)
 
     return idml_stats, all_body, all_list, all_titles, all_figs
 
@@ -176,10 +246,16 @@ def main() -> None:
         default=str(DEFAULT_CANON_PATH),
         help="Path to canonical JSON to compare against.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes used to parse chapter IDMLs (default: CPU count; 1 = serial).",
+    )
     args = parser.parse_args()
     canon_path = Path(args.canonical)
     canon, canon_paras, canon_list_items, canon_titles, canon_figs = load_canonical(canon_path)
-    idml_stats, all_body, all_list, all_titles, all_figs = analyze_idml()
+    idml_stats, all_body, all_list, all_titles, all_figs = analyze_idml(args.workers)
 
     body_norm = [normalize(t) for t in all_body]
     list_norm = [normalize(t) for t in all_list]
@@ -189,9 +265,10 @@ def main() -> None:
     list_total = len(list_norm)
     title_total = len(title_norm)
 
-    body_matched = sum(1 for t in body_norm if t in canon_paras)
-    list_matched = sum(1 for t in list_norm if t in canon_list_items)
-    title_matched = sum(1 for t in title_norm if t in canon_titles)
+    # map(set.__contains__) keeps the membership loop in C; True sums as 1.
+    body_matched = sum(map(canon_paras.__contains__, body_norm))
+    list_matched = sum(map(canon_list_items.__contains__, list_norm))
+    title_matched = sum(map(canon_titles.__contains__, title_norm))
 
     missing_in_canon = sorted(all_figs - canon_figs)[:20]
     extra_in_canon = sorted(canon_figs - all_figs)[:20]
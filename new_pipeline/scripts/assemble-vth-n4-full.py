@@ -2,51 +2,85 @@
 """
 Assemble all VTH N4 rewrites (ch 1-30) into a single canonical JSON.
 """
-import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from canonical_json import dump_json, load_json
+
 REPO_ROOT = Path(__file__).parent.parent.parent
 REWRITE_DIR = REPO_ROOT / "new_pipeline" / "output" / "vth_n4"
 SKELETON_DIR = REWRITE_DIR  # Skeletons are in same dir
 BASE_CANONICAL = REPO_ROOT / "new_pipeline" / "output" / "_canonical_jsons_all" / "VTH_N4__canonical_vth_n4_full_30ch.with_figures.with_captions.cleaned.links.json"
 OUTPUT_JSON = REPO_ROOT / "new_pipeline" / "output" / "_canonical_jsons_all" / "VTH_N4__canonical_vth_n4_full_30ch.REWRITTEN.json"
 
-def apply_rewrites_to_section(section: dict, rewritten_units: dict) -> dict:
-    """Apply rewritten units to a section's content."""
-    content = section.get('content', [])
-    for block in content:
-        block_id = block.get('id')
-        if block_id and block_id in rewritten_units:
-            rewritten_text = rewritten_units[block_id]
-            if isinstance(rewritten_text, str) and rewritten_text.strip():
-                # Apply rewrite to text field
-                block['text'] = rewritten_text
-                if 'basis' in block:
-                    block['basis'] = rewritten_text
-    return section
+def index_blocks(book: dict) -> dict:
+    """Map block id -> [(chapter, block), ...] for every content block in the book."""
+    block_index = {}
+    for ch in book['chapters']:
+        for section in ch.get('sections', []):
+            for block in section.get('content', []):
+                block_id = block.get('id')
+                if block_id:
+                    block_index.setdefault(block_id, []).append((ch, block))
+    return block_index
+
+def apply_rewrites(chapter: dict, rewritten_units: dict, block_index: dict) -> int:
+    """Apply rewritten units to the chapter's blocks; returns the number of blocks updated."""
+    applied = 0
+    for block_id, rewritten_text in rewritten_units.items():
+        if not (isinstance(rewritten_text, str) and rewritten_text.strip()):
+            continue
+        for owner, block in block_index.get(block_id, ()):
+            # Rewrite files are per chapter: never touch a block that lives elsewhere
+            if owner is not chapter:
+                continue
+            block['text'] = rewritten_text
+            if 'basis' in block:
+                block['basis'] = rewritten_text
+            applied += 1
+    return applied
+
+def index_chapters(book: dict) -> dict:
+    """Map chapter number -> chapter, keyed as stored (str or int); the first chapter per key wins."""
+    chapters_by_num = {}
+    for ch in book['chapters']:
+        number = ch.get('number')
+        if isinstance(number, (str, int, float)):
+            chapters_by_num.setdefault(number, ch)
+    return chapters_by_num
+
+def load_rewrites(ch_num: int):
+    """Return (rewrite_file, data) for a chapter, or (None, None) if it has no rewrite file."""
+    # Try to find rewrite file (pass2 preferred)
+    rewrite_file = REWRITE_DIR / f"rewrites_ch{ch_num}_pass2.json"
+    if not rewrite_file.exists():
+        rewrite_file = REWRITE_DIR / f"rewrites_ch{ch_num}.json"
+    if not rewrite_file.exists():
+        return None, None
+    return rewrite_file, load_json(rewrite_file)
 
 def main():
-    # Load base canonical
-    print(f"Loading base canonical: {BASE_CANONICAL}")
-    with open(BASE_CANONICAL, 'r', encoding='utf-8') as f:
-        book = json.load(f)
+    ch_nums = range(1, 31)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        # Rewrite files are read in the background while the base canonical loads
+        rewrites = pool.map(load_rewrites, ch_nums)
+        
+        # Load base canonical
+        print(f"Loading base canonical: {BASE_CANONICAL}")
+        book = load_json(BASE_CANONICAL)
+        block_index = index_blocks(book)
+        chapters_by_num = index_chapters(book)
+        rewrites = list(rewrites)
     
     total_applied = 0
     
     # Process each chapter
-    for ch_num in range(1, 31):
-        # Try to find rewrite file (pass2 preferred)
-        rewrite_file = REWRITE_DIR / f"rewrites_ch{ch_num}_pass2.json"
-        if not rewrite_file.exists():
-            rewrite_file = REWRITE_DIR / f"rewrites_ch{ch_num}.json"
-        
-        if not rewrite_file.exists():
+    for ch_num, (rewrite_file, rewrite_data) in zip(ch_nums, rewrites):
+        if rewrite_file is None:
             print(f"  ⚠️ No rewrite found for chapter {ch_num}")
             continue
         
         print(f"  📖 Loading rewrites for chapter {ch_num}...")
-        with open(rewrite_file, 'r', encoding='utf-8') as f:
-            rewrite_data = json.load(f)
         
         # Extract rewritten units
         rewritten_units = rewrite_data.get('rewritten_units', {})
@@ -57,37 +91,21 @@ def main():
         units_count = len(rewritten_units)
         
         # Find the chapter in the book
-        chapter = None
-        for ch in book['chapters']:
-            if ch.get('number') in [str(ch_num), ch_num]:
-                chapter = ch
-                break
+        chapter = chapters_by_num.get(ch_num) or chapters_by_num.get(str(ch_num))
         
         if not chapter:
             print(f"    ⚠️ Chapter {ch_num} not found in canonical")
             continue
         
-        # Apply rewrites to each section
-        applied = 0
-        for section in chapter.get('sections', []):
-            content = section.get('content', [])
-            for block in content:
-                block_id = block.get('id')
-                if block_id and block_id in rewritten_units:
-                    rewritten_text = rewritten_units[block_id]
-                    if isinstance(rewritten_text, str) and rewritten_text.strip():
-                        block['text'] = rewritten_text
-                        if 'basis' in block:
-                            block['basis'] = rewritten_text
-                        applied += 1
+        # Apply rewrites via the book-wide block index
+        applied = apply_rewrites(chapter, rewritten_units, block_index)
         
         print(f"    ✅ Applied {applied}/{units_count} rewrites to chapter {ch_num}")
         total_applied += applied
     
     # Save assembled canonical
     print(f"\n💾 Saving assembled canonical to: {OUTPUT_JSON}")
-    with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-        json.dump(book, f, indent=2, ensure_ascii=False)
+    dump_json(OUTPUT_JSON, book)
     
     print(f"\n✅ Assembly complete!")
     print(f"   Total rewrites applied: {total_applied}")
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
+import json
 import os
+import select
+import string
 import time
 import subprocess
+from collections import deque
 from pathlib import Path
 
 # Config
@@ -14,88 +18,204 @@ def ensure_dir(d):
     if not os.path.exists(d):
         os.makedirs(d)
 
-def generate_jsx(chapter_num):
-    ch_str = f"{chapter_num:02d}"
-    indd_name = f"{ch_str}-VTH_Combined_03.2024.indd"
-    idml_name = f"{ch_str}-VTH_Combined_03.2024.idml"
-    
-    indd_path = os.path.join(SOURCE_DIR, indd_name)
-    idml_path = os.path.join(OUTPUT_DIR, idml_name)
-    
-    # Escape paths for JSX (windows style backslashes or just forward slashes work in JS)
-    # Better to use forward slashes for JS strings
-    js_indd_path = indd_path.replace("\\", "/")
-    js_idml_path = idml_path.replace("\\", "/")
-    js_log_file = LOG_FILE.replace("\\", "/")
-    
-    script_content = f'''
+BATCH_SIZE = 6  # chapters exported per osascript call / InDesign `do script`
+SECONDS_PER_CHAPTER = 120
+
+# Parsed once; $log_file and $jobs are filled in per batch
+JSX_TEMPLATE = string.Template(r'''
 #target "InDesign"
 #targetengine "session"
 
-(function() {{
-    var logFile = File("{js_log_file}");
-    function log(msg) {{
+(function() {
+    var logFile = File($log_file);
+    var jobs = $jobs;
+
+    function log(ch, msg) {
         logFile.open("a");
-        logFile.writeln("CH{ch_str}: " + msg);
+        logFile.writeln("CH" + ch + ": " + msg);
         logFile.close();
-    }}
+    }
 
-    try {{
-        // Suppress UI
-        var prevUI = app.scriptPreferences.userInteractionLevel;
-        app.scriptPreferences.userInteractionLevel = UserInteractionLevels.NEVER_INTERACT;
+    function exportChapter(job) {
+        var inddFile = File(job.indd);
+        var idmlFile = File(job.idml);
         
-        var inddFile = File("{js_indd_path}");
-        var idmlFile = File("{js_idml_path}");
+        log(job.ch, "Starting export for " + inddFile.name);
         
-        log("Starting export for " + inddFile.name);
-        
-        if (!inddFile.exists) {{
-            log("ERROR: Source file not found: " + inddFile.fsName);
+        if (!inddFile.exists) {
+            log(job.ch, "ERROR: Source file not found: " + inddFile.fsName);
             return;
-        }}
+        }
         
-        if (idmlFile.exists) {{
-             log("IDML already exists, skipping");
+        if (idmlFile.exists) {
+             log(job.ch, "IDML already exists, skipping");
              return;
-        }}
+        }
 
-        log("Opening document...");
+        log(job.ch, "Opening document...");
         var doc = app.open(inddFile, false); // Open hidden
+        try {
+            log(job.ch, "Exporting to IDML...");
+            doc.exportFile(ExportFormat.INDESIGN_MARKUP, idmlFile, false);
+        } finally {
+            log(job.ch, "Closing document...");
+            doc.close(SaveOptions.NO);
+        }
         
-        log("Exporting to IDML...");
-        doc.exportFile(ExportFormat.INDESIGN_MARKUP, idmlFile, false);
-        
-        log("Closing document...");
-        doc.close(SaveOptions.NO);
-        
-        log("SUCCESS");
-        
-    }} catch (e) {{
-        log("ERROR: " + e.message);
-    }} finally {{
-        try {{
+        log(job.ch, "SUCCESS");
+    }
+
+    // Suppress UI
+    var prevUI = app.scriptPreferences.userInteractionLevel;
+    app.scriptPreferences.userInteractionLevel = UserInteractionLevels.NEVER_INTERACT;
+    try {
+        for (var i = 0; i < jobs.length; i++) {
+            // One failing chapter must not stop the rest of the batch
+            try {
+                exportChapter(jobs[i]);
+            } catch (e) {
+                log(jobs[i].ch, "ERROR: " + e.message);
+            }
+        }
+    } finally {
+        try {
             app.scriptPreferences.userInteractionLevel = prevUI;
-        }} catch(e) {{}}
-    }}
-}})();
-'''
-    script_path = os.path.join(TEMP_SCRIPT_DIR, f"export_ch{ch_str}.jsx")
-    with open(script_path, "w") as f:
-        f.write(script_content)
-    return script_path, idml_path
+        } catch(e) {}
+    }
+})();
+''')
+
+def chapter_paths(chapter_num):
+    ch_str = f"{chapter_num:02d}"
+    indd_name = f"{ch_str}-VTH_Combined_03.2024.indd"
+    idml_name = f"{ch_str}-VTH_Combined_03.2024.idml"
+    
+    indd_path = os.path.join(SOURCE_DIR, indd_name)
+    idml_path = os.path.join(OUTPUT_DIR, idml_name)
+    return ch_str, indd_path, idml_path
+
+def generate_jsx(chapter_nums):
+    # One script exports the whole batch, so InDesign is activated and the JSX engine
+    # warmed up once per batch instead of once per chapter.
+    jobs = []
+    for chapter_num in chapter_nums:
+        ch_str, indd_path, idml_path = chapter_paths(chapter_num)
+        # Better to use forward slashes for JS strings
+        jobs.append({
+            "ch": ch_str,
+            "indd": indd_path.replace("\\", "/"),
+            "idml": idml_path.replace("\\", "/"),
+        })
+    js_log_file = LOG_FILE.replace("\\", "/")
+    # JSON is a valid (ES3) JavaScript literal and takes care of quoting the paths
+    script_content = JSX_TEMPLATE.substitute(log_file=json.dumps(js_log_file), jobs=json.dumps(jobs))
+    first, last = jobs[0]["ch"], jobs[-1]["ch"]
+    script_path = os.path.join(TEMP_SCRIPT_DIR, f"export_ch{first}-{last}.jsx")
+    Path(script_path).write_text(script_content)
+    return script_path
 
-def run_script(script_path):
+def run_script(script_path, timeout=SECONDS_PER_CHAPTER):
     # Use AppleScript to tell InDesign to run the script
-    # We use 'do script' which is standard
+    # We use 'do script' which is standard; lift the 2 min Apple event timeout for batches
     cmd = f'''
 tell application "Adobe InDesign 2026"
     activate
+    with timeout of {timeout} seconds
         do script (POSIX file "{script_path}") language javascript
+    end timeout
 end tell
 '''
     # Run osascript
-    subprocess.run(['osascript', '-e', cmd], check=True, timeout=120)
+    subprocess.run(['osascript', '-e', cmd], check=True, timeout=timeout)
+
+POLL_INTERVAL = 0.25  # fallback when kqueue is unavailable
+SETTLE_SECONDS = 1.0  # file must stop changing for this long before it counts as written
+MIN_IDML_SIZE = 1000
+
+def file_size(path):
+    # One stat(2) instead of exists() + getsize(); None when the file is not there
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return None
+
+class ExportWatcher:
+    # Blocks on kqueue vnode events for the output dir (file appears) and the file itself
+    # (file grows), so completion is seen as soon as InDesign stops writing instead of on
+    # the next 2s poll. Where kqueue is missing (not macOS) it degrades to short sleeps.
+    def __init__(self, path):
+        self.path = path
+        self.kq = select.kqueue() if hasattr(select, "kqueue") else None
+        self.dir_fd = None
+        self.file_fd = None
+        if self.kq is not None:
+            self.fflags = (select.KQ_NOTE_WRITE | select.KQ_NOTE_EXTEND |
+                           select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME)
+            self.dir_fd = os.open(os.path.dirname(path), os.O_RDONLY)
+            self._watch(self.dir_fd)
+
+    def _watch(self, fd):
+        ev = select.kevent(fd, filter=select.KQ_FILTER_VNODE,
+                           flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR, fflags=self.fflags)
+        self.kq.control([ev], 0, 0)
+
+    def _close_file(self):
+        if self.file_fd is not None:
+            os.close(self.file_fd)
+            self.file_fd = None
+
+    def wait(self, timeout):
+        if self.kq is None:
+            time.sleep(min(timeout, POLL_INTERVAL))
+            return
+        if self.file_fd is None:
+            try:
+                self.file_fd = os.open(self.path, os.O_RDONLY)
+                self._watch(self.file_fd)
+            except FileNotFoundError:
+                pass
+        for ev in self.kq.control(None, 8, timeout):
+            if ev.ident == self.file_fd and ev.fflags & (select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME):
+                self._close_file()  # replaced or removed: re-open by path on the next wait
+
+    def close(self):
+        self._close_file()
+        if self.dir_fd is not None:
+            os.close(self.dir_fd)
+        if self.kq is not None:
+            self.kq.close()
+
+def wait_for_export(idml_path, timeout=180):
+    # Returns the final size once the file exists, is > MIN_IDML_SIZE and has not changed
+    # for SETTLE_SECONDS; None on timeout.
+    deadline = time.monotonic() + timeout
+    watcher = ExportWatcher(idml_path)
+    try:
+        last_size = None
+        last_change = time.monotonic()
+        while True:
+            now = time.monotonic()
+            size = file_size(idml_path)
+            if size != last_size:
+                last_size, last_change = size, now
+            elif size is not None and size > MIN_IDML_SIZE and now - last_change >= SETTLE_SECONDS:
+                return size
+            if now >= deadline:
+                return None
+            wait = deadline - now
+            if size is not None:
+                wait = min(wait, max(0.0, last_change + SETTLE_SECONDS - now) or SETTLE_SECONDS)
+            watcher.wait(wait)
+    finally:
+        watcher.close()
+
+def print_log_tail(n):
+    # Same as `tail -n 5`, without spawning a shell for it
+    try:
+        with open(LOG_FILE, encoding="utf-8", errors="replace") as f:
+            print("".join(deque(f, maxlen=n)), end="")
+    except FileNotFoundError:
+        pass
 
 def main():
     ensure_dir(TEMP_SCRIPT_DIR)
@@ -106,46 +226,55 @@ def main():
         with open(LOG_FILE, "a") as f:
             f.write(f"\n--- Run started at {time.ctime()} ---\n")
     
+    pending = []
     for ch in range(7, 31):
-        script_path, idml_path = generate_jsx(ch)
+        _, _, idml_path = chapter_paths(ch)
         
-        if os.path.exists(idml_path):
+        size = file_size(idml_path)
+        if size is not None:
             # Check if file size is valid (not empty/corrupt)
-            if os.path.getsize(idml_path) > 1000:
+            if size > MIN_IDML_SIZE:
                 print(f"Skipping Chapter {ch} (IDML exists and valid)")
                 continue
             else:
                  print(f"Chapter {ch} IDML exists but too small, re-exporting...")
                  os.remove(idml_path)
-            
-        print(f"Exporting Chapter {ch}...")
+        pending.append(ch)
+    
+    for i in range(0, len(pending), BATCH_SIZE):
+        batch = pending[i:i + BATCH_SIZE]
+        script_path = generate_jsx(batch)
+        print(f"Exporting Chapters {', '.join(str(ch) for ch in batch)}...")
+        script_error = None
+        export_timeout = 180 # 3 min wait max
         try:
-            run_script(script_path)
-            
-            # Wait for file to appear
-            start_time = time.time()
-            success = False
-            while time.time() - start_time < 180: # 3 min wait max
-                if os.path.exists(idml_path):
-                    # Check if file is growing or stable
-                    initial_size = os.path.getsize(idml_path)
-                    if initial_size > 0:
-                        time.sleep(2) # wait a bit to ensure write finish
-                        final_size = os.path.getsize(idml_path)
-                        if final_size == initial_size and final_size > 1000:
-                            print(f"✅ Chapter {ch} exported successfully! ({final_size/1024/1024:.2f} MB)")
-                            success = True
-                            break
-                time.sleep(2)
-            
-            if not success:
+            run_script(script_path, timeout=SECONDS_PER_CHAPTER * len(batch))
+        except subprocess.TimeoutExpired as e:
+            # Timed out partway through the batch: InDesign may still be writing, so wait
+            # for every chapter as usual and only fail the ones that never show up.
+            script_error = e
+        except Exception as e:
+            # Failed outright (InDesign not running, osascript error): nothing more is coming,
+            # so only count chapters already on disk and fail the rest right away.
+            script_error = e
+            export_timeout = 0
+        
+        for ch in batch:
+            _, _, idml_path = chapter_paths(ch)
+            if export_timeout:
+                # Wait for file to appear and stop growing
+                final_size = wait_for_export(idml_path, timeout=export_timeout)
+            else:
+                size = file_size(idml_path)
+                final_size = size if size is not None and size > MIN_IDML_SIZE else None
+            if final_size is not None:
+                print(f"✅ Chapter {ch} exported successfully! ({final_size/1024/1024:.2f} MB)")
+            elif script_error is not None:
+                print(f"❌ Failed to run script for Chapter {ch}: {script_error}")
+            else:
                 print(f"❌ Timeout waiting for Chapter {ch} IDML")
                 # print log file tail
-                if os.path.exists(LOG_FILE):
-                    os.system(f"tail -n 5 {LOG_FILE}")
-                
-        except Exception as e:
-            print(f"❌ Failed to run script for Chapter {ch}: {e}")
+                print_log_tail(5)
             
         time.sleep(2) # Cooldown
 
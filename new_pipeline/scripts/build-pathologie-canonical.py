@@ -9,17 +9,30 @@ This script parses all chapter IDMLs and extracts:
 - Figures with captions
 - Lists
 """
+import argparse
+import hashlib
 import json
+import os
 import re
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 from datetime import datetime
 from lxml import etree
 
+try:
+    import orjson  # optional: much faster JSON load/dump
+except ImportError:
+    orjson = None
+
 REPO_ROOT = Path(__file__).parent.parent.parent
 IDML_DIR = REPO_ROOT / "designs-relinked" / "MBO Pathologie nivo 4_9789083412016_03"
 OUTPUT_JSON = REPO_ROOT / "new_pipeline" / "output" / "_canonical_jsons_all" / "PATHOLOGIE_N4__PERFECT_CANONICAL.json"
 ASSETS_DIR = REPO_ROOT / "new_pipeline" / "assets"
+# --cache: per-IDML extraction results, keyed by path + mtime + size and by this script's
+# source, so any change to the extraction code invalidates old entries.
+CACHE_DIR = REPO_ROOT / "new_pipeline" / "output" / ".cache" / "pathologie_idml"
 
 # Chapter titles for Pathologie N4 (manually defined for accuracy)
 CHAPTER_TITLES = {
@@ -54,83 +67,167 @@ STYLE_MAPPING = {
     "•Fotobijschrift": "caption",
 }
 
+# Lowercase substring fallbacks, tried in order when no STYLE_MAPPING pattern matches
+STYLE_FALLBACKS = (
+    # Chapter/section headers
+    (('chapter header',), 'section_h1'),
+    (('subchapter header',), 'section_h2'),
+    # Body text
+    (('basis', 'body', 'tabel'), 'body'),
+    # Lists
+    (('bullet', 'nummer'), 'list_item'),
+    # Captions
+    (('caption', 'bijschrift'), 'caption'),
+    # Skip these non-content styles
+    (('voetregel', 'inhoudsopgave'), 'skip'),
+)
+
+STRIP_CHARS = str.maketrans('', '', '\xad\ufeff')
+RE_CHAPTER_NUMBER = re.compile(r'(\d+)')
+RE_SECTION_NUMBER = re.compile(r'^(\d+(?:\.\d+)*)\s+(.+)$')
+RE_CAPTION = re.compile(r'^(?:Afbeelding|Figuur)\s+(\d+(?:\.\d+)*)[:\.\s]*(.*)$', re.IGNORECASE)
+
+# Common broken words from hyphenation
+BROKEN_WORD_FIXES = {
+    'gen eesmiddelen': 'geneesmiddelen',
+    'haarzakj es': 'haarzakjes',
+    'Schimmelinfec ties': 'Schimmelinfecties',
+    'do or': 'door',
+    'Eczemat euze': 'Eczemateuze',
+    'Hersen vlies': 'Hersenvlies',
+    'h ersenen': 'hersenen',
+    'zorg vrager': 'zorgvrager',
+    'zorg professional': 'zorgprofessional',
+    'bloed vaten': 'bloedvaten',
+    'zenuw stelsel': 'zenuwstelsel',
+    'hart spier': 'hartspier',
+    'long ontsteking': 'longontsteking',
+    'maag darm': 'maagdarm',
+}
+# The patterns never overlap one another, and every pattern needs a space that no replacement
+# contains, so one left-to-right pass gives the same result as replacing them one by one.
+RE_BROKEN_WORD = re.compile('|'.join(map(re.escape, BROKEN_WORD_FIXES)))
+
+
+def fix_broken_word(match: re.Match) -> str:
+    return BROKEN_WORD_FIXES[match.group(0)]
+
 
 def clean_text(text: str) -> str:
     """Clean and normalize text."""
-    if not text:
+    if not text or text.isspace():
         return ""
-    # Remove soft hyphens
-    text = text.replace('\xad', '').replace('­', '')
-    # Remove special InDesign characters
-    text = text.replace('\ufeff', '')
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    # Remove soft hyphens and special InDesign characters (BOM) in one pass
+    text = text.translate(STRIP_CHARS)
+    # Normalize whitespace (split() uses the same whitespace set as \s and drops the ends)
+    text = ' '.join(text.split())
     
-    # Fix common broken words from hyphenation
-    broken_word_fixes = {
-        'gen eesmiddelen': 'geneesmiddelen',
-        'haarzakj es': 'haarzakjes',
-        'Schimmelinfec ties': 'Schimmelinfecties',
-        'do or': 'door',
-        'Eczemat euze': 'Eczemateuze',
-        'Hersen vlies': 'Hersenvlies',
-        'h ersenen': 'hersenen',
-        'zorg vrager': 'zorgvrager',
-        'zorg professional': 'zorgprofessional',
-        'bloed vaten': 'bloedvaten',
-        'zenuw stelsel': 'zenuwstelsel',
-        'hart spier': 'hartspier',
-        'long ontsteking': 'longontsteking',
-        'maag darm': 'maagdarm',
-    }
-    for wrong, correct in broken_word_fixes.items():
-        text = text.replace(wrong, correct)
+    # Fix common broken words from hyphenation (one pass for all patterns)
+    text = RE_BROKEN_WORD.sub(fix_broken_word, text)
     
     return text
 
 
-def get_style_type(style: str) -> str:
-    """Map InDesign paragraph style to content type."""
-    if not style:
-        return "body"
-    # Remove "ParagraphStyle/" prefix
-    style_name = style.replace("ParagraphStyle/", "")
-    
-    # Check exact matches first
+def match_style_type(style_name: str) -> str:
+    """Map a paragraph style name (without prefix) to content type by pattern."""
+    # Check mapped patterns first
     for pattern, content_type in STYLE_MAPPING.items():
         if pattern in style_name:
             return content_type
     
     # Default mappings based on style name patterns
     style_lower = style_name.lower()
+    for patterns, content_type in STYLE_FALLBACKS:
+        if any(p in style_lower for p in patterns):
+            return content_type
     
-    # Chapter/section headers
-    if 'chapter header' in style_lower:
-        return 'section_h1'
-    if 'subchapter header' in style_lower:
-        return 'section_h2'
-    
-    # Body text
-    if 'basis' in style_lower or 'body' in style_lower or 'tabel' in style_lower:
-        return 'body'
-    
-    # Lists
-    if 'bullet' in style_lower or 'nummer' in style_lower:
-        return 'list_item'
+    return "body"  # Default to body
+
+
+# Exact style names resolve with one dict hit. Values come from match_style_type itself, so
+# a name that an earlier substring pattern would claim keeps the same type.
+STYLE_EXACT = {name: match_style_type(name) for name in STYLE_MAPPING}
+
+# Running-head and table-of-contents styles, which are skipped. They are filtered through the
+# classifier so a name that a content pattern would claim is never short-circuited.
+SKIP_EXACT = frozenset(
+    name for name in ("Voetregel", "Voetregel links", "Voetregel rechts", "Inhoudsopgave",
+                      "Inhoudsopgave 1", "Inhoudsopgave 2", "Inhoudsopgave 3")
+    if match_style_type(name) == "skip"
+)
+
+
+@lru_cache(maxsize=512)
+def get_style_type(style: str) -> str:
+    """Map InDesign paragraph style to content type."""
+    if not style:
+        return "body"
+    # Remove "ParagraphStyle/" prefix
+    style_name = style.replace("ParagraphStyle/", "")
     
-    # Captions
-    if 'caption' in style_lower or 'bijschrift' in style_lower:
-        return 'caption'
+    if style_name in SKIP_EXACT:
+        return "skip"
+    content_type = STYLE_EXACT.get(style_name)
+    if content_type is not None:
+        return content_type
+    return match_style_type(style_name)
+
+
+PSR_XPATH = etree.XPath('//ParagraphStyleRange')
+STORY_PARSER = etree.XMLParser(remove_blank_text=True, collect_ids=False)
+RE_PSR_TAG = re.compile(rb'<ParagraphStyleRange\b')
+RE_PSR_STYLE = re.compile(rb'<ParagraphStyleRange\b[^>]*?\sAppliedParagraphStyle="([^"&]*)"')
+
+
+def story_is_skippable(data: bytes) -> bool:
+    """True if every paragraph in the raw story XML has a style that maps to 'skip'.
     
-    # Skip these non-content styles
-    if 'voetregel' in style_lower or 'inhoudsopgave' in style_lower:
-        return 'skip'
+    Unknown styles default to body, so a story is only skipped when each ParagraphStyleRange
+    tag has a plain AppliedParagraphStyle we can classify; anything unusual gets a full parse.
+    """
+    styles = RE_PSR_STYLE.findall(data)
+    if len(styles) != len(RE_PSR_TAG.findall(data)):
+        return False
+    return all(get_style_type(style.decode('utf-8')) == 'skip' for style in styles)
+
+
+@lru_cache(maxsize=1)
+def script_digest() -> str:
+    return hashlib.blake2b(Path(__file__).read_bytes(), digest_size=16).hexdigest()
+
+
+def extract_content_from_idml(idml_path: Path, use_cache: bool = False) -> dict:
+    """Extract all content from an IDML file; with use_cache, reuse the on-disk entry while unchanged."""
+    if not use_cache:
+        content, _ = parse_idml_content(idml_path)
+        return content
+    st = idml_path.stat()
+    key_src = f"{script_digest()}:{idml_path.resolve()}:{st.st_mtime_ns}:{st.st_size}"
+    cache_path = CACHE_DIR / f"{hashlib.blake2b(key_src.encode('utf-8'), digest_size=16).hexdigest()}.json"
+    try:
+        if orjson is not None:
+            cached = orjson.loads(cache_path.read_bytes())
+        else:
+            cached = json.loads(cache_path.read_text(encoding='utf-8'))
+        return cached
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
     
-    return "body"  # Default to body
+    content, ok = parse_idml_content(idml_path)
+    if ok:
+        # Write-then-rename so a concurrent or interrupted run never sees a partial entry
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        if orjson is not None:
+            tmp_path.write_bytes(orjson.dumps(content))
+        else:
+            tmp_path.write_text(json.dumps(content, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, cache_path)
+    return content
 
 
-def extract_content_from_idml(idml_path: Path) -> dict:
-    """Extract all content from an IDML file."""
+def parse_idml_content(idml_path: Path) -> tuple:
+    """Extract all content from an IDML file; returns (content, ok)."""
     content = {
         "chapter_number": None,
         "chapter_title": None,
@@ -139,51 +236,61 @@ def extract_content_from_idml(idml_path: Path) -> dict:
     }
     
     current_section = None
-    current_content = []
+    
+    def start_section(number, title, level):
+        # Sections are registered as soon as they open; blocks are appended to them in place
+        section = {"number": number, "title": title, "level": level, "content": []}
+        content['sections'].append(section)
+        return section
     
     try:
         with zipfile.ZipFile(idml_path, 'r') as zf:
             # Get all story files
-            story_files = sorted([f for f in zf.namelist() if f.startswith("Stories/Story_") and f.endswith(".xml")])
+            story_files = sorted(
+                (info for info in zf.infolist()
+                 if info.filename.startswith("Stories/Story_") and info.filename.endswith(".xml")),
+                key=lambda info: info.filename,
+            )
             
-            all_paragraphs = []
+            # Paragraph types and texts as parallel columns for the structure pass
+            para_types = []
+            para_texts = []
             
             for story_file in story_files:
-                with zf.open(story_file) as f:
-                    tree = etree.parse(f)
+                # Stories are small: decompress in one go and parse the contiguous buffer
+                data = zf.read(story_file)
+                # Footer and TOC stories produce no blocks; a byte scan is far cheaper than a parse
+                if story_is_skippable(data):
+                    continue
+                root = etree.fromstring(data, STORY_PARSER)
+                # Extract all paragraph style ranges
+                for psr in PSR_XPATH(root):
+                    style = psr.get('AppliedParagraphStyle', '')
+                    style_type = get_style_type(style)
                     
-                    # Extract all paragraph style ranges
-                    for psr in tree.xpath('//ParagraphStyleRange'):
-                        style = psr.get('AppliedParagraphStyle', '')
-                        style_type = get_style_type(style)
-                        
-                        # Get all text content from this paragraph
-                        text_parts = []
-                        for content_el in psr.xpath('.//Content'):
-                            if content_el.text:
-                                text_parts.append(content_el.text)
-                        
-                        text = clean_text(' '.join(text_parts))
-                        
-                        if text:
-                            all_paragraphs.append({
-                                "style": style,
-                                "style_type": style_type,
-                                "text": text
-                            })
-            
+                    # Get all text content from this paragraph
+                    text_parts = []
+                    for content_el in psr.iter('Content'):
+                        t = content_el.text
+                        # Whitespace-only runs would be collapsed by clean_text anyway
+                        if t and not t.isspace():
+                            text_parts.append(t)
+                    
+                    text = clean_text(' '.join(text_parts))
+                    
+                    if text:
+                        para_types.append(style_type)
+                        para_texts.append(text)
+        
             # Process paragraphs to build structure
-            for para in all_paragraphs:
-                style_type = para['style_type']
-                text = para['text']
-                
+            for style_type, text in zip(para_types, para_texts):
                 # Skip non-content paragraphs
                 if style_type == 'skip':
                     continue
                 
                 if style_type == 'chapter_number':
                     # Extract chapter number
-                    match = re.search(r'(\d+)', text)
+                    match = RE_CHAPTER_NUMBER.search(text)
                     if match:
                         content['chapter_number'] = int(match.group(1))
                 
@@ -191,13 +298,8 @@ def extract_content_from_idml(idml_path: Path) -> dict:
                     content['chapter_title'] = text
                 
                 elif style_type in ('section_h1', 'section_h2', 'section_h3', 'heading'):
-                    # Save current section
-                    if current_section:
-                        current_section['content'] = current_content
-                        content['sections'].append(current_section)
-                    
                     # Extract section number from text
-                    sec_match = re.match(r'^(\d+(?:\.\d+)*)\s+(.+)$', text)
+                    sec_match = RE_SECTION_NUMBER.match(text)
                     if sec_match:
                         sec_num = sec_match.group(1)
                         sec_title = sec_match.group(2)
@@ -205,66 +307,68 @@ def extract_content_from_idml(idml_path: Path) -> dict:
                         sec_num = None
                         sec_title = text
                     
-                    current_section = {
-                        "number": sec_num,
-                        "title": sec_title,
-                        "level": 1 if style_type == 'section_h1' else (2 if style_type == 'section_h2' else 3)
-                    }
-                    current_content = []
+                    current_section = start_section(
+                        sec_num,
+                        sec_title,
+                        1 if style_type == 'section_h1' else (2 if style_type == 'section_h2' else 3),
+                    )
                 
                 elif style_type == 'body':
                     if current_section is None:
                         # Create intro section
-                        current_section = {"number": None, "title": "Inleiding", "level": 1}
-                    current_content.append({"type": "paragraph", "text": text})
+                        current_section = start_section(None, "Inleiding", 1)
+                    current_section['content'].append({"type": "paragraph", "text": text})
                 
                 elif style_type == 'list_item':
                     if current_section is None:
-                        current_section = {"number": None, "title": "Inleiding", "level": 1}
-                    current_content.append({"type": "list_item", "text": text})
+                        current_section = start_section(None, "Inleiding", 1)
+                    current_section['content'].append({"type": "list_item", "text": text})
                 
                 elif style_type == 'caption':
                     # Extract figure number and caption
-                    cap_match = re.match(r'^(?:Afbeelding|Figuur)\s+(\d+(?:\.\d+)*)[:\.\s]*(.*)$', text, re.IGNORECASE)
+                    cap_match = RE_CAPTION.match(text)
                     if cap_match:
+                        # Key by the full figure number ("3.2" and "3.2.1" stay apart);
+                        # numbers without a sub-number can't be placed
                         fig_num = cap_match.group(1)
-                        caption_text = cap_match.group(2).strip()
-                        content['captions'][f"Afbeelding {fig_num}"] = caption_text
-            
-            # Save last section
-            if current_section:
-                current_section['content'] = current_content
-                content['sections'].append(current_section)
+                        if '.' in fig_num:
+                            content['captions'][fig_num] = cap_match.group(2).strip()
     
     except Exception as e:
         print(f"Error processing {idml_path}: {e}")
+        return content, False
     
-    return content
+    return content, True
 
 
-def merge_list_items(content_blocks: list) -> list:
-    """Merge consecutive list items into proper list structures."""
+def merge_list_items(content_blocks: list) -> tuple:
+    """Merge consecutive list items into proper list structures.
+    
+    Returns (blocks, paragraph_count, list_count) so the caller can keep running statistics.
+    """
     result = []
-    current_list = None
+    items = None  # items of the list currently being filled, already placed in result
+    paragraph_count = 0
+    list_count = 0
     
     for block in content_blocks:
-        if block['type'] == 'list_item':
-            if current_list is None:
-                current_list = {"type": "list", "items": []}
-            current_list['items'].append(block['text'])
+        block_type = block['type']
+        if block_type == 'list_item':
+            if items is None:
+                items = []
+                result.append({"type": "list", "items": items})
+                list_count += 1
+            items.append(block['text'])
         else:
-            if current_list is not None:
-                result.append(current_list)
-                current_list = None
+            items = None
+            if block_type == 'paragraph':
+                paragraph_count += 1
             result.append(block)
     
-    if current_list is not None:
-        result.append(current_list)
-    
-    return result
+    return result, paragraph_count, list_count
 
 
-def build_canonical():
+def build_canonical(workers=None, use_cache=False):
     """Build the complete canonical JSON."""
     print("Building Pathologie N4 Canonical JSON...")
     
@@ -295,104 +399,117 @@ def build_canonical():
         "chapters": []
     }
     
-    # Process each chapter IDML
-    for ch_num in range(1, 13):
-        idml_path = IDML_DIR / f"Pathologie_mbo_CH{ch_num:02d}_03.2024.idml"
-        
-        if not idml_path.exists():
-            print(f"  ⚠️  Missing: {idml_path.name}")
-            continue
-        
-        print(f"  Processing Chapter {ch_num}...")
-        chapter_content = extract_content_from_idml(idml_path)
-        
-        chapter = {
-            "number": ch_num,
-            "title": CHAPTER_TITLES.get(ch_num, chapter_content.get('chapter_title') or f"Hoofdstuk {ch_num}"),
-            "opener_image": f"new_pipeline/assets/images/pathologie_chapter_openers/chapter_{ch_num}_opener.jpg",
-            "sections": []
-        }
-        
-        # Process sections
-        for sec in chapter_content['sections']:
-            section = {
-                "number": sec.get('number'),
-                "title": sec.get('title', ''),
-                "content": merge_list_items(sec.get('content', []))
-            }
-            chapter['sections'].append(section)
-        
-        # Add figures to chapter - collect all unique figures for this chapter
-        chapter_figures = []
-        for fig_key, caption in chapter_content['captions'].items():
-            fig_match = re.search(r'(\d+)\.(\d+)', fig_key)
-            if fig_match:
-                ch_in_fig = int(fig_match.group(1))
-                fig_num_full = f"{fig_match.group(1)}.{fig_match.group(2)}"
-                if ch_in_fig == ch_num:
-                    chapter_figures.append({
-                        "type": "figure",
-                        "number": fig_num_full,
-                        "caption": caption,
-                        "src": f"new_pipeline/assets/figures/pathologie/Afbeelding_{fig_num_full}.png"
-                    })
-        
-        # Sort figures by number and add to first section
-        chapter_figures.sort(key=lambda f: (int(f['number'].split('.')[0]), int(f['number'].split('.')[1])))
-        
-        if chapter_figures and chapter['sections']:
-            # Distribute figures across sections
-            figs_per_section = max(1, len(chapter_figures) // max(1, len(chapter['sections'])))
-            fig_idx = 0
-            for sec_idx, section in enumerate(chapter['sections']):
-                # Add figures to this section
-                num_figs = figs_per_section if sec_idx < len(chapter['sections']) - 1 else len(chapter_figures) - fig_idx
-                for _ in range(num_figs):
-                    if fig_idx < len(chapter_figures):
-                        section['content'].append(chapter_figures[fig_idx])
-                        fig_idx += 1
-        
-        canonical['chapters'].append(chapter)
-    
-    # Calculate statistics
-    total_sections = sum(len(ch['sections']) for ch in canonical['chapters'])
-    total_paragraphs = 0
-    total_figures = 0
-    total_lists = 0
+    # Running totals, updated as blocks are added (no second walk over the finished tree)
+    stats = {"sections": 0, "paragraphs": 0, "figures": 0, "lists": 0}
     
-    for ch in canonical['chapters']:
-        for sec in ch['sections']:
-            for block in sec.get('content', []):
-                if block['type'] == 'paragraph':
-                    total_paragraphs += 1
-                elif block['type'] == 'figure':
-                    total_figures += 1
-                elif block['type'] == 'list':
-                    total_lists += 1
+    # Process each chapter IDML. The IDMLs are parsed in worker processes; map() hands the
+    # results back in chapter order, so the loop below runs exactly as it did serially.
+    # One directory read instead of a stat() per chapter
+    try:
+        with os.scandir(IDML_DIR) as it:
+            idml_names = {entry.name for entry in it if entry.name.endswith('.idml')}
+    except FileNotFoundError:
+        idml_names = set()
+    chapter_paths = [(ch_num, IDML_DIR / f"Pathologie_mbo_CH{ch_num:02d}_03.2024.idml") for ch_num in range(1, 13)]
+    existing = [idml_path for _, idml_path in chapter_paths if idml_path.name in idml_names]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(existing)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        extracted = pool.map(partial(extract_content_from_idml, use_cache=use_cache), existing)
+        for ch_num, idml_path in chapter_paths:
+            if idml_path.name not in idml_names:
+                print(f"  ⚠️  Missing: {idml_path.name}")
+                continue
+            
+            print(f"  Processing Chapter {ch_num}...")
+            chapter_content = next(extracted)
+            
+            chapter = {
+                "number": ch_num,
+                "title": CHAPTER_TITLES.get(ch_num, chapter_content.get('chapter_title') or f"Hoofdstuk {ch_num}"),
+                "opener_image": f"new_pipeline/assets/images/pathologie_chapter_openers/chapter_{ch_num}_opener.jpg",
+                "sections": []
+            }
+            
+            # Process sections
+            for sec in chapter_content['sections']:
+                blocks, paragraph_count, list_count = merge_list_items(sec.get('content', []))
+                section = {
+                    "number": sec.get('number'),
+                    "title": sec.get('title', ''),
+                    "content": blocks
+                }
+                chapter['sections'].append(section)
+                stats['paragraphs'] += paragraph_count
+                stats['lists'] += list_count
+            stats['sections'] += len(chapter['sections'])
+            
+            # Add figures to chapter - collect all unique figures for this chapter, in figure order
+            # (stable sort on the figure number, so deeper numbers keep caption order)
+            numbered = []
+            for fig_num, caption in chapter_content['captions'].items():
+                ch_part, sub_part = fig_num.split('.')[:2]
+                if int(ch_part) == ch_num:
+                    numbered.append((int(sub_part), f"{ch_part}.{sub_part}", caption))
+            numbered.sort(key=lambda fig: fig[0])
+            chapter_figures = [
+                {
+                    "type": "figure",
+                    "number": fig_num_full,
+                    "caption": caption,
+                    "src": f"new_pipeline/assets/figures/pathologie/Afbeelding_{fig_num_full}.png"
+                }
+                for _, fig_num_full, caption in numbered
+            ]
+            
+            if chapter_figures and chapter['sections']:
+                # Distribute figures across sections
+                # (figs_per_section each; the last section takes the remainder)
+                sections = chapter['sections']
+                figs_per_section = max(1, len(chapter_figures) // len(sections))
+                splits = [i * figs_per_section for i in range(len(sections))] + [len(chapter_figures)]
+                for sec_idx, section in enumerate(sections):
+                    section['content'].extend(chapter_figures[splits[sec_idx]:splits[sec_idx + 1]])
+                stats['figures'] += len(chapter_figures)
+            
+            canonical['chapters'].append(chapter)
     
     canonical['meta']['statistics'] = {
         "total_chapters": len(canonical['chapters']),
-        "total_sections": total_sections,
-        "total_paragraphs": total_paragraphs,
-        "total_figures": total_figures,
-        "total_lists": total_lists
+        "total_sections": stats['sections'],
+        "total_paragraphs": stats['paragraphs'],
+        "total_figures": stats['figures'],
+        "total_lists": stats['lists']
     }
     
     # Save
     OUTPUT_JSON.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-        json.dump(canonical, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        OUTPUT_JSON.write_bytes(orjson.dumps(canonical, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
+            json.dump(canonical, f, indent=2, ensure_ascii=False)
     
     print(f"\n✅ Pathologie N4 Canonical JSON created!")
     print(f"   Output: {OUTPUT_JSON}")
     print(f"\n📊 Statistics:")
     print(f"   Chapters: {len(canonical['chapters'])}")
-    print(f"   Sections: {total_sections}")
-    print(f"   Paragraphs: {total_paragraphs}")
-    print(f"   Figures: {total_figures}")
-    print(f"   Lists: {total_lists}")
+    print(f"   Sections: {stats['sections']}")
+    print(f"   Paragraphs: {stats['paragraphs']}")
+    print(f"   Figures: {stats['figures']}")
+    print(f"   Lists: {stats['lists']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Pathologie N4 canonical JSON from the chapter IDMLs.")
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse per-IDML results from new_pipeline/output/.cache for unchanged IDMLs",
+    )
+    args = parser.parse_args()
+    build_canonical(use_cache=args.cache)
 
 
 if __name__ == "__main__":
-    build_canonical()
+    main()
 
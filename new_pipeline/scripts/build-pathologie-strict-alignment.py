@@ -7,25 +7,43 @@ Strict Pathologie N4 alignment from original IDML:
 Notes:
 - Reading order is approximated via TextFrame positions (min_x, min_y).
 - All stories are included in skeleton; canonical uses the ordered story list.
+- JSON is written compact; set PRETTY_JSON=1 for indented output.
 """
 from __future__ import annotations
 
+import argparse
+import hashlib
+import io
 import json
+import os
+import pickle
 import re
+import sys
 import zipfile
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
 from lxml import etree
 
+try:
+    import orjson  # optional: much faster JSON dump
+except ImportError:
+    orjson = None
+
 
 REPO_ROOT = Path(__file__).parent.parent.parent
 IDML_DIR = REPO_ROOT / "designs-relinked" / "MBO Pathologie nivo 4_9789083412016_03"
 OUT_CANON = REPO_ROOT / "new_pipeline" / "output" / "_canonical_jsons_all" / "PATHOLOGIE_N4__STRICT_CANONICAL.json"
 OUT_SKELETON = REPO_ROOT / "new_pipeline" / "output" / "_canonical_jsons_all" / "PATHOLOGIE_N4__STRICT_SKELETON.json"
+PRETTY_JSON = os.environ.get("PRETTY_JSON") == "1"
+# --cache: per-chapter (skeleton, canonical) pickles keyed by IDML content and by this script's
+# source, so any change to the extraction code invalidates old entries.
+CACHE_DIR = REPO_ROOT / "new_pipeline" / "output" / ".cache" / "pathologie_strict"
 
 
 CHAPTER_TITLES = {
@@ -63,21 +81,34 @@ STYLE_MAPPING = {
 }
 
 
-HEADING_NUMBER_RE = re.compile(r"^(\d+(?:\.\d+)*)\s+(.*)$")
-HEADING_ONLY_RE = re.compile(r"^(\d+(?:\.\d+)*)$")
 FIGURE_RE = re.compile(r"^(Afbeelding|Figuur)\s+(\d+(?:\.\d+)*)\s*[:\.\s]*(.*)$", re.IGNORECASE)
 TABLE_CAPTION_RE = re.compile(r"^Tabel\s+(\d+(?:\.\d+)*)\b", re.IGNORECASE)
+# Soft hyphens and BOMs, dropped in one translate pass
+STRIP_CHARS = str.maketrans("", "", "\xad\ufeff")
+# A story's score counts its non-empty paragraphs of these types (tables included)
+SCORED_TYPES = frozenset(("body", "list_item", "section_h1", "section_h2", "section_h3", "caption"))
+
+# Compiled once; string xpath() calls are recompiled on every invocation
+TEXT_FRAME_XPATH = etree.XPath("//TextFrame")
+ANCHOR_XPATH = etree.XPath(".//PathPointType/@Anchor")
 
 
 def clean_text(text: str) -> str:
     if not text:
         return ""
-    text = text.replace("\xad", "").replace("­", "").replace("\ufeff", "")
+    # Fast path for already-clean text. Every whitespace character except " " is non-printable,
+    # as are soft hyphens and BOMs, so a printable text with no double space and no space before
+    # , or . only needs its ends trimmed.
+    if text.isprintable() and "  " not in text and " ," not in text and " ." not in text:
+        return text.strip()
+    text = text.translate(STRIP_CHARS)
     text = " ".join(text.split())
     text = text.replace(" ,", ",").replace(" .", ".")
     return text
 
 
+# Only a few dozen distinct style names occur, each on thousands of paragraphs
+@lru_cache(maxsize=512)
 def get_style_type(style: str) -> str:
     if not style:
         return "body"
@@ -111,38 +142,20 @@ class StoryInfo:
     frame_count: int
 
 
-def parse_story_id(tree: etree._ElementTree) -> str | None:
-    root = tree.getroot()
-    story_el = root.xpath("//Story")
-    if story_el:
-        return story_el[0].get("Self")
-    return None
-
-
-def story_score(tree: etree._ElementTree) -> int:
-    score = 0
-    for psr in tree.xpath("//ParagraphStyleRange"):
-        style = psr.get("AppliedParagraphStyle", "")
-        st = get_style_type(style)
-        if st in ("body", "list_item", "section_h1", "section_h2", "section_h3", "caption"):
-            text = clean_text("".join(psr.xpath(".//Content/text()")))
-            if text:
-                score += 1
-    return score
-
-
-def extract_story_positions(zf: zipfile.ZipFile, story_id_by_file: dict[str, str]) -> dict[str, StoryInfo]:
-    story_positions: dict[str, StoryInfo] = {}
-    spread_files = [f for f in zf.namelist() if f.startswith("Spreads/Spread_") and f.endswith(".xml")]
+def extract_story_positions(
+    zf: zipfile.ZipFile, spread_files: list[str], story_id_by_file: dict[str, str]
+) -> dict[str, StoryInfo]:
+    # Frame positions per story, reduced with min() once all spreads are read
+    frames_by_story: dict[str, list[tuple[float, float]]] = defaultdict(list)
     for spread_file in spread_files:
-        with zf.open(spread_file) as f:
-            tree = etree.parse(f)
-        for tf in tree.xpath("//TextFrame"):
+        # One read() per member: ZipExtFile is slow on the many small reads etree.parse makes
+        tree = etree.ElementTree(etree.fromstring(zf.read(spread_file)))
+        for tf in TEXT_FRAME_XPATH(tree):
             parent_story = tf.get("ParentStory")
             if not parent_story:
                 continue
             # Parse path anchors to get bbox
-            anchors = tf.xpath(".//PathPointType/@Anchor")
+            anchors = ANCHOR_XPATH(tf)
             coords = []
             for anchor in anchors:
                 parts = anchor.split()
@@ -168,69 +181,140 @@ def extract_story_positions(zf: zipfile.ZipFile, story_id_by_file: dict[str, str
                         ty = float(parts[5])
                     except ValueError:
                         tx = ty = 0.0
-            abs_x = min_x + tx
-            abs_y = min_y + ty
-
-            info = story_positions.get(parent_story)
-            if not info:
-                story_positions[parent_story] = StoryInfo(
-                    story_id=parent_story,
-                    story_file=story_id_by_file.get(parent_story, ""),
-                    score=0,
-                    min_x=abs_x,
-                    min_y=abs_y,
-                    frame_count=1,
-                )
-            else:
-                info.frame_count += 1
-                if info.min_x is None or abs_x < info.min_x:
-                    info.min_x = abs_x
-                if info.min_y is None or abs_y < info.min_y:
-                    info.min_y = abs_y
+            frames_by_story[parent_story].append((min_x + tx, min_y + ty))
+
+    story_positions: dict[str, StoryInfo] = {}
+    for parent_story, frames in frames_by_story.items():
+        story_positions[parent_story] = StoryInfo(
+            story_id=parent_story,
+            story_file=story_id_by_file.get(parent_story, ""),
+            score=0,
+            min_x=min(x for x, _ in frames),
+            min_y=min(y for _, y in frames),
+            frame_count=len(frames),
+        )
     return story_positions
 
 
+def content_text(content_el: etree._Element) -> str:
+    """Text directly inside a Content element, i.e. what `Content/text()` yields for it."""
+    if len(content_el) == 0:
+        return content_el.text or ""
+    return (content_el.text or "") + "".join(child.tail or "" for child in content_el)
+
+
+def cell_text(cell: etree._Element) -> str:
+    """Cleaned Content text below a table cell; same text as joining `.//Content/text()`."""
+    return clean_text("".join(map(content_text, cell.iter("Content"))))
+
+
 def extract_table(table_el: etree._Element) -> dict[str, Any]:
+    # iter() walks the subtree in C; tags are un-namespaced, like the former .//Row and .//Cell
     rows = []
-    for row in table_el.xpath(".//Row"):
-        row_cells = []
+    for row in table_el.iter("Row"):
         # Cells are referenced via Cell nodes on the table, but text is nested.
-        cells = row.xpath(".//Cell") if row is not None else []
-        for cell in cells:
-            cell_text = clean_text("".join(cell.xpath(".//Content/text()")))
-            row_cells.append(cell_text)
+        row_cells = [cell_text(cell) for cell in row.iter("Cell")]
         if row_cells:
             rows.append(row_cells)
     if not rows:
         # Fallback: gather any cell contents in document order
-        cells = table_el.xpath(".//Cell")
-        for cell in cells:
-            cell_text = clean_text("".join(cell.xpath(".//Content/text()")))
-            rows.append([cell_text])
+        rows = [[cell_text(cell)] for cell in table_el.iter("Cell")]
     return {"rows": rows}
 
 
 def parse_heading(text: str) -> tuple[str | None, str, str]:
+    # Hand-rolled match of a leading dotted number ("3", "3.2.1") followed by whitespace or the
+    # end of the text; cheaper than two regex matches. text is clean_text output (no newlines).
     raw = text
-    match = HEADING_NUMBER_RE.match(text)
-    if match:
-        return match.group(1), match.group(2).strip(), raw
-    match = HEADING_ONLY_RE.match(text)
-    if match:
-        return match.group(1), "", raw
+    n = len(text)
+    end = 0
+    while end < n and text[end].isdecimal():
+        end += 1
+    if end == 0:
+        return None, text, raw
+    while end + 1 < n and text[end] == "." and text[end + 1].isdecimal():
+        end += 2
+        while end < n and text[end].isdecimal():
+            end += 1
+    if end == n:
+        return text, "", raw
+    if text[end].isspace():
+        return text[:end], text[end:].strip(), raw
     return None, text, raw
 
 
-def extract_story_blocks(tree: etree._ElementTree, story_id: str, story_file: str, ch_num: int) -> list[dict]:
-    blocks: list[dict] = []
-    block_index = 0
+def extract_story_blocks(story_xml: IO[bytes], story_file: str, ch_num: int) -> tuple[str | None, list[dict], int]:
+    """Stream-parse one story; return (story_id, blocks, score).
+
+    The score counts the story's non-empty paragraphs of SCORED_TYPES.
+    """
+    # One iterparse pass over the story. A paragraph's text is every Content text node below it
+    # (tables included), so each open paragraph collects Content text as Content elements
+    # complete; blocks are built afterwards, in document order, once all texts are known.
+    # Finished paragraphs outside tables are cleared so the tree never holds the whole story.
+    # Entries: (style, type, text parts, emits, scored), or (None, "table", rows, True, False)
+    story_id = None
+    entries: list[tuple[str | None, str, list, bool, bool]] = []
+    open_parts: list[list[str]] = []  # text buffers of the open paragraphs being collected
+    psr_collects: list[bool] = []  # per open ParagraphStyleRange: owns a buffer in open_parts
+    open_tables: list[list] = []  # rows lists of the open tables, filled when each table ends
     in_table = False
 
-    for event, elem in etree.iterwalk(tree.getroot(), events=("start", "end")):
-        tag = etree.QName(elem.tag).localname if isinstance(elem.tag, str) else elem.tag
+    # No remove_blank_text: it would drop whitespace-only Content (e.g. the space before a
+    # processing instruction) and the joined paragraph text would glue words together.
+    # recover is left at its default (False) so malformed stories still fail loudly.
+    for event, elem in etree.iterparse(story_xml, events=("start", "end"), huge_tree=True, collect_ids=False):
+        raw_tag = elem.tag
+        if raw_tag == "Content":
+            if event == "end" and open_parts:
+                text = content_text(elem)
+                for parts in open_parts:
+                    parts.append(text)
+            continue
+        if raw_tag == "Story" and story_id is None and event == "start":
+            story_id = elem.get("Self")
+        tag = raw_tag.rpartition("}")[2]
+
+        if tag == "Table":
+            if event == "start":
+                rows: list = []
+                open_tables.append(rows)
+                entries.append((None, "table", rows, True, False))
+                in_table = True
+            else:
+                # Cell text is read from the finished table subtree
+                open_tables.pop().extend(extract_table(elem)["rows"])
+                in_table = False
+
+        elif tag == "ParagraphStyleRange":
+            if event == "end":
+                if psr_collects.pop():
+                    open_parts.pop()
+                if not open_tables:
+                    elem.clear(keep_tail=True)
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+                continue
+            style = sys.intern(elem.get("AppliedParagraphStyle", "") or "")
+            stype = get_style_type(style)
+            emits = not in_table and stype != "skip"
+            # Scoring counts every un-namespaced paragraph, inside tables too
+            scored = raw_tag == "ParagraphStyleRange" and stype in SCORED_TYPES
+            collects = emits or scored
+            psr_collects.append(collects)
+            if collects:
+                parts: list[str] = []
+                open_parts.append(parts)
+                entries.append((style, stype, parts, emits, scored))
 
-        if event == "start" and tag == "Table":
-            table_data = extract_table(elem)
+    blocks: list[dict] = []
+    block_index = 0
+    score = 0
+    # Every block of the story points at the same source dict (it is never mutated)
+    source = {"story": story_file, "story_id": story_id}
+
+    for style, stype, parts, emits, scored in entries:
+        if style is None:
             # Use last paragraph as table caption if it matches (do not remove)
             caption = None
             if blocks and blocks[-1]["type"] == "paragraph":
@@ -242,205 +326,191 @@ def extract_story_blocks(tree: etree._ElementTree, story_id: str, story_file: st
                     "id": f"ch{ch_num:02d}_{story_id}_tbl{block_index:04d}",
                     "type": "table",
                     "caption": caption,
-                    "rows": table_data["rows"],
-                    "source": {"story": story_file, "story_id": story_id},
+                    "rows": parts,
+                    "source": source,
                 }
             )
             block_index += 1
-            in_table = True
-
-        if event == "end" and tag == "Table":
-            in_table = False
+            continue
 
-        if event == "start" and tag == "ParagraphStyleRange" and not in_table:
-            style = elem.get("AppliedParagraphStyle", "") or ""
-            stype = get_style_type(style)
-            if stype == "skip":
-                continue
-            text = clean_text("".join(elem.xpath(".//Content/text()")))
-            if not text:
-                continue
+        text = clean_text("".join(parts))
+        if not text:
+            continue
+        if scored:
+            score += 1
+        if not emits:
+            continue
 
-            block_id = f"ch{ch_num:02d}_{story_id}_p{block_index:04d}"
-            block_index += 1
+        block_id = f"ch{ch_num:02d}_{story_id}_p{block_index:04d}"
+        block_index += 1
 
-            if stype in ("section_h1", "section_h2", "section_h3"):
-                number, title, raw_heading = parse_heading(text)
-                blocks.append(
-                    {
-                        "id": block_id,
-                        "type": "heading",
-                        "level": 1 if stype == "section_h1" else (2 if stype == "section_h2" else 3),
-                        "number": number,
-                        "title": title,
-                        "raw": raw_heading,
-                        "style": style,
-                        "source": {"story": story_file, "story_id": story_id},
-                    }
-                )
-                continue
-
-            if stype == "list_item":
-                blocks.append(
-                    {
-                        "id": block_id,
-                        "type": "list_item",
-                        "text": text,
-                        "style": style,
-                        "source": {"story": story_file, "story_id": story_id},
-                    }
-                )
-                continue
+        if stype in ("section_h1", "section_h2", "section_h3"):
+            number, title, raw_heading = parse_heading(text)
+            blocks.append(
+                {
+                    "id": block_id,
+                    "type": "heading",
+                    "level": 1 if stype == "section_h1" else (2 if stype == "section_h2" else 3),
+                    "number": number,
+                    "title": title,
+                    "raw": raw_heading,
+                    "style": style,
+                    "source": source,
+                }
+            )
+            continue
 
-            if stype == "caption":
-                match = FIGURE_RE.match(text)
-                if match:
-                    fig_num = match.group(2)
-                    caption = match.group(3).strip()
-                else:
-                    fig_num = None
-                    caption = text
-                blocks.append(
-                    {
-                        "id": block_id,
-                        "type": "figure",
-                        "number": fig_num,
-                        "caption": caption,
-                        "raw": text,
-                        "src": f"new_pipeline/assets/figures/pathologie/Afbeelding_{fig_num}.png" if fig_num else None,
-                        "style": style,
-                        "source": {"story": story_file, "story_id": story_id},
-                    }
-                )
-                continue
+        if stype == "list_item":
+            blocks.append(
+                {
+                    "id": block_id,
+                    "type": "list_item",
+                    "text": text,
+                    "style": style,
+                    "source": source,
+                }
+            )
+            continue
 
-            if stype in ("chapter_number", "chapter_title"):
-                # Keep as paragraph but tagged
-                blocks.append(
-                    {
-                        "id": block_id,
-                        "type": "paragraph",
-                        "text": text,
-                        "style": style,
-                        "role": stype,
-                        "source": {"story": story_file, "story_id": story_id},
-                    }
-                )
-                continue
+        if stype == "caption":
+            match = FIGURE_RE.match(text)
+            if match:
+                fig_num = match.group(2)
+                caption = match.group(3).strip()
+            else:
+                fig_num = None
+                caption = text
+            blocks.append(
+                {
+                    "id": block_id,
+                    "type": "figure",
+                    "number": fig_num,
+                    "caption": caption,
+                    "raw": text,
+                    "src": f"new_pipeline/assets/figures/pathologie/Afbeelding_{fig_num}.png" if fig_num else None,
+                    "style": style,
+                    "source": source,
+                }
+            )
+            continue
 
-            # default body paragraph
+        if stype in ("chapter_number", "chapter_title"):
+            # Keep as paragraph but tagged
             blocks.append(
                 {
                     "id": block_id,
                     "type": "paragraph",
                     "text": text,
                     "style": style,
-                    "source": {"story": story_file, "story_id": story_id},
+                    "role": stype,
+                    "source": source,
                 }
             )
+            continue
 
-    return blocks
-
-
-def group_list_items(blocks: list[dict]) -> list[dict]:
-    grouped: list[dict] = []
-    current_list: dict | None = None
-
-    for block in blocks:
-        if block["type"] == "list_item":
-            if current_list is None:
-                current_list = {
-                    "id": block["id"] + "_list",
-                    "type": "list",
-                    "items": [],
-                    "source": block.get("source"),
-                }
-            current_list["items"].append(block["text"])
-        else:
-            if current_list is not None:
-                grouped.append(current_list)
-                current_list = None
-            grouped.append(block)
-
-    if current_list is not None:
-        grouped.append(current_list)
-
-    # Convert paragraph ending with ':' into list intro when followed by list
-    with_intro: list[dict] = []
-    i = 0
-    while i < len(grouped):
-        block = grouped[i]
-        if (
-            block["type"] == "paragraph"
-            and block.get("text", "").endswith(":")
-            and i + 1 < len(grouped)
-            and grouped[i + 1]["type"] == "list"
-        ):
-            next_list = grouped[i + 1]
-            next_list["intro"] = block["text"]
-            i += 1  # skip the paragraph block
-        else:
-            with_intro.append(block)
-        i += 1
+        # default body paragraph
+        blocks.append(
+            {
+                "id": block_id,
+                "type": "paragraph",
+                "text": text,
+                "style": style,
+                "source": source,
+            }
+        )
 
-    return with_intro
+    return story_id, blocks, score
 
 
 def build_sections_from_blocks(blocks: list[dict]) -> list[dict]:
     sections: list[dict] = []
-    current = None
+    content: list[dict] | None = None  # content list of the open section
 
     for block in blocks:
-        if block["type"] == "heading":
-            if current:
-                sections.append(current)
-            current = {
-                "number": block.get("number"),
-                "title": block.get("title", ""),
-                "raw_title": block.get("raw", ""),
-                "level": block.get("level", 1),
-                "content": [],
-                "source": block.get("source"),
-                "id": block.get("id"),
-            }
+        if block["type"] != "heading":
+            # The common case: the block joins the open section
+            if content is None:
+                content = []
+                sections.append(
+                    {
+                        "number": None,
+                        "title": "Inleiding",
+                        "level": 1,
+                        "content": content,
+                        "source": block.get("source"),
+                    }
+                )
+            content.append(block)
             continue
-        if current is None:
-            current = {
-                "number": None,
-                "title": "Inleiding",
-                "level": 1,
-                "content": [],
-                "source": block.get("source"),
+        # Heading blocks from extract_story_blocks always carry all of these keys
+        content = []
+        sections.append(
+            {
+                "number": block["number"],
+                "title": block["title"],
+                "raw_title": block["raw"],
+                "level": block["level"],
+                "content": content,
+                "source": block["source"],
+                "id": block["id"],
             }
-        current["content"].append(block)
+        )
 
-    if current:
-        sections.append(current)
     return sections
 
 
-def build_for_chapter(ch_num: int) -> tuple[dict, dict]:
+@lru_cache(maxsize=1)
+def script_digest() -> str:
+    return hashlib.blake2b(Path(__file__).read_bytes(), digest_size=16).hexdigest()
+
+
+def build_for_chapter(ch_num: int, use_cache: bool = False) -> tuple[dict, dict]:
     idml_path = IDML_DIR / f"Pathologie_mbo_CH{ch_num:02d}_03.2024.idml"
     if not idml_path.exists():
         return {}, {}
-
+    if not use_cache:
+        return extract_chapter(ch_num, idml_path)
+
+    # Keyed by the IDML's content and this script's source (plus path, since the skeleton records it)
+    digest = hashlib.blake2b(idml_path.read_bytes(), digest_size=16)
+    digest.update(f"{script_digest()}:{ch_num}:{idml_path.resolve()}".encode("utf-8"))
+    cache_path = CACHE_DIR / f"{digest.hexdigest()}.blocks.pkl"
+    try:
+        with cache_path.open("rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+
+    result = extract_chapter(ch_num, idml_path)
+    # Write-then-rename so a concurrent or interrupted run never sees a partial entry
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    with tmp_path.open("wb") as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    return result
+
+
+def extract_chapter(ch_num: int, idml_path: Path) -> tuple[dict, dict]:
     with zipfile.ZipFile(idml_path, "r") as zf:
-        story_files = [f for f in zf.namelist() if f.startswith("Stories/Story_") and f.endswith(".xml")]
+        # List the archive once and split out the story and spread members
+        all_names = zf.namelist()
+        story_files = [f for f in all_names if f.startswith("Stories/Story_") and f.endswith(".xml")]
+        spread_files = [f for f in all_names if f.startswith("Spreads/Spread_") and f.endswith(".xml")]
         story_id_by_file: dict[str, str] = {}
-        story_tree_by_id: dict[str, etree._ElementTree] = {}
+        story_blocks_by_id: dict[str, list[dict]] = {}
         story_scores: dict[str, int] = {}
 
+        # One walk per story yields both its blocks and its ordering score
         for story_file in story_files:
-            with zf.open(story_file) as f:
-                tree = etree.parse(f)
-            story_id = parse_story_id(tree)
+            story_id, blocks, score = extract_story_blocks(io.BytesIO(zf.read(story_file)), story_file, ch_num)
             if not story_id:
                 continue
             story_id_by_file[story_id] = story_file
-            story_tree_by_id[story_id] = tree
-            story_scores[story_id] = story_score(tree)
+            story_blocks_by_id[story_id] = blocks
+            story_scores[story_id] = score
 
-        story_positions = extract_story_positions(zf, story_id_by_file)
+        story_positions = extract_story_positions(zf, spread_files, story_id_by_file)
 
         # Build ordered story list
         story_infos: list[StoryInfo] = []
@@ -466,14 +536,11 @@ def build_for_chapter(ch_num: int) -> tuple[dict, dict]:
             )
         )
 
-        # Extract blocks per story
+        # Collect blocks per story in reading order
         stories_out = []
         ordered_blocks = []
         for story in story_infos:
-            tree = story_tree_by_id.get(story.story_id)
-            if not tree:
-                continue
-            blocks = extract_story_blocks(tree, story.story_id, story.story_file, ch_num)
+            blocks = story_blocks_by_id[story.story_id]
             if not blocks:
                 continue
             stories_out.append(
@@ -509,7 +576,31 @@ def build_for_chapter(ch_num: int) -> tuple[dict, dict]:
         return skeleton, canonical
 
 
+def write_json(path: Path, data: dict) -> None:
+    """Write JSON without first building the whole document as one str.
+
+    Output is compact (the indented encoder is several times slower and ~30% larger);
+    set PRETTY_JSON=1 for indented, human-readable files.
+    """
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 if PRETTY_JSON else 0))
+        return
+    with path.open("w", encoding="utf-8", buffering=1 << 20) as fh:
+        if PRETTY_JSON:
+            json.dump(data, fh, indent=2, ensure_ascii=False)
+        else:
+            json.dump(data, fh, ensure_ascii=False, separators=(",", ":"))
+
+
 def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse per-chapter results from new_pipeline/output/.cache for unchanged IDMLs",
+    )
+    args = parser.parse_args()
+
     generated_at = datetime.now().isoformat(timespec="seconds")
 
     skeleton = {
@@ -552,8 +643,12 @@ def main() -> None:
         "chapters": [],
     }
 
-    for ch_num in range(1, 13):
-        s, c = build_for_chapter(ch_num)
+    # Chapters are independent IDMLs: build them in worker processes; map() keeps chapter order
+    chapter_nums = range(1, 13)
+    with ProcessPoolExecutor(max_workers=min(len(chapter_nums), os.cpu_count() or 1)) as pool:
+        results = list(pool.map(partial(build_for_chapter, use_cache=args.cache), chapter_nums))
+
+    for s, c in results:
         if s:
             skeleton["chapters"].append(s)
         if c:
@@ -562,8 +657,8 @@ def main() -> None:
     OUT_SKELETON.parent.mkdir(parents=True, exist_ok=True)
     OUT_CANON.parent.mkdir(parents=True, exist_ok=True)
 
-    OUT_SKELETON.write_text(json.dumps(skeleton, indent=2, ensure_ascii=False), encoding="utf-8")
-    OUT_CANON.write_text(json.dumps(canonical, indent=2, ensure_ascii=False), encoding="utf-8")
+    write_json(OUT_SKELETON, skeleton)
+    write_json(OUT_CANON, canonical)
 
     print(f"✅ Wrote skeleton: {OUT_SKELETON}")
     print(f"✅ Wrote canonical: {OUT_CANON}")
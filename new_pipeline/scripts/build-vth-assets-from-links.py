@@ -5,10 +5,13 @@ Converts source images to PNG named Afbeelding_{X.Y}.png using canonical figure
 """
 from __future__ import annotations
 
+import argparse
 import json
+import os
 import re
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Tuple
@@ -22,6 +25,10 @@ REPORT = REPO / "new_pipeline" / "output" / "vth_n4_text_extract" / "vth_n4_link
 SUPPORTED_EXTS = {".tif", ".tiff", ".jpg", ".jpeg", ".png", ".psd"}
 
 
+def fig_sort_key(key: str) -> Tuple[int, int]:
+    return int(key.split(".")[0]), int(key.split(".")[1])
+
+
 def get_expected_fig_keys() -> List[str]:
     with CANONICAL.open("r", encoding="utf-8") as f:
         book = json.load(f)
@@ -36,7 +43,7 @@ def get_expected_fig_keys() -> List[str]:
                     m = re.search(r"(\d+\.\d+)", fig)
                     if m:
                         keys.add(m.group(1))
-    return sorted(keys, key=lambda x: (int(x.split(".")[0]), int(x.split(".")[1])))
+    return sorted(keys, key=fig_sort_key)
 
 
 def extract_fig_key(filename: str) -> str | None:
@@ -78,7 +85,25 @@ def convert_to_png(src: Path, dest: Path) -> None:
     subprocess.run(cmd, check=True)
 
 
+def convert_task(task: Tuple[str, Path, Path]) -> Tuple[str, Path, Path, Exception | None]:
+    key, src, dest = task
+    try:
+        convert_to_png(src, dest)
+    except Exception as e:
+        return key, src, dest, e
+    return key, src, dest, None
+
+
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Build VTH N4 figure assets from the InDesign Links folder")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of ImageMagick conversions to run at once (default: CPU count)",
+    )
+    args = parser.parse_args()
+
     if not LINKS_DIR.exists():
         raise SystemExit(f"Links folder not found: {LINKS_DIR}")
     if not CANONICAL.exists():
@@ -98,18 +123,25 @@ def main() -> None:
 
     missing = []
     converted = []
-    for key in sorted(expected, key=lambda x: (int(x.split(".")[0]), int(x.split(".")[1]))):
+    tasks = []
+    for key in sorted(expected, key=fig_sort_key):
         src = best_sources.get(key)
-        dest = OUT_DIR / f"Afbeelding_{key}.png"
         if not src:
             missing.append(key)
             continue
-        try:
-            convert_to_png(src, dest)
-            converted.append({"key": key, "src": str(src), "dest": str(dest)})
-        except Exception as e:
-            missing.append(key)
-            print(f"Failed to convert {key} from {src}: {e}")
+        tasks.append((key, src, OUT_DIR / f"Afbeelding_{key}.png"))
+
+    # Each conversion is a separate magick process, so threads are enough to keep all cores busy.
+    # map() yields results in task (figure) order.
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        for key, src, dest, error in pool.map(convert_task, tasks):
+            if error is None:
+                converted.append({"key": key, "src": str(src), "dest": str(dest)})
+            else:
+                missing.append(key)
+                print(f"Failed to convert {key} from {src}: {error}")
+    # Unmatched and failed figures together, in figure order
+    missing.sort(key=fig_sort_key)
 
     REPORT.parent.mkdir(parents=True, exist_ok=True)
     with REPORT.open("w", encoding="utf-8") as f:
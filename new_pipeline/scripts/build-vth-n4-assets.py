@@ -37,6 +37,7 @@ COVERS_OUT_DIR = OUTPUT_DIR / "covers"
 MAPPING_PATH = OUTPUT_DIR / "VTH_N4_MAPPING.json"
 ORIGINAL_PDF_OUT = OUTPUT_DIR / "original_pdf" / "MBO_VTH_nivo_4_ORIGINAL_HIRES.pdf"
 FIGURE_MAP_PATH = OUTPUT_DIR / "figures_mapping.json"
+MOGRIFY_BATCH_SIZE = 500  # figures per `magick mogrify` call
 
 CONTENT_PATTERN = re.compile(r"<Content>([^<]*)</Content>")
 PARAGRAPH_STYLE_PATTERN = re.compile(
@@ -156,13 +157,26 @@ def copy_figures() -> tuple[list, dict]:
             figure_map[str(img)] = str(target_path)
             figures.append(fig_id)
 
-    # Flatten images (white background)
-    for img in FIGURES_DIR.glob("*.png"):
-        subprocess.run(
-            ["magick", str(img), "-background", "white", "-flatten", str(img)],
+    # Flatten images (white background) in place, one mogrify per batch instead of one magick
+    # process per image; batches keep the argument list within OS limits
+    names = sorted(img.name for img in FIGURES_DIR.glob("*.png"))
+    for start in range(0, len(names), MOGRIFY_BATCH_SIZE):
+        batch = names[start:start + MOGRIFY_BATCH_SIZE]
+        result = subprocess.run(
+            ["magick", "mogrify", "-background", "white", "-flatten", *batch],
+            cwd=FIGURES_DIR,
             check=False,
             capture_output=True,
         )
+        if result.returncode != 0:
+            # A bad file may stop the batch; flatten this batch one by one so the rest still get done
+            for name in batch:
+                subprocess.run(
+                    ["magick", name, "-background", "white", "-flatten", name],
+                    cwd=FIGURES_DIR,
+                    check=False,
+                    capture_output=True,
+                )
 
     return figures, figure_map
 
@@ -0,0 +1,40 @@
+"""
+Shared load/dump helpers for the large VTH canonical JSON files.
+
+Imported by the VTH scripts in this directory (run as `python3 new_pipeline/scripts/<script>.py`,
+so this directory is on sys.path).
+"""
+import json
+import mmap
+import os
+
+try:
+    import orjson  # optional: much faster JSON load/dump
+except ImportError:
+    orjson = None
+
+
+def load_json(path):
+    if orjson is None:
+        return json.loads(path.read_bytes())
+    # orjson parses straight from the mapped file: no intermediate bytes copy of the whole book
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            return orjson.loads(view)
+
+
+def dump_json(path, obj):
+    # Same 2-space indented layout as json.dump(indent=2, ensure_ascii=False), so the files stay
+    # readable and diffable; orjson produces it in C instead of the pure-Python indent encoder.
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    # One encoded buffer handed to the OS directly (no text-mode encode/buffer layer)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)